@@ -1,4 +1,11 @@
-import pygame
+import gc
+import time
+import zlib
+from frontend import InlinePresenter, ThreadedPresenter, HeadlessPresenter
+from pacing import FramePacer, AudioPacer
+from inputs import KeyboardInput, ScriptInput
+import savestate
+from profiler import CB_BASE, SLOT_INTERRUPT, SLOT_HALTED, SLOT_TAIL, CALL_OPCODES, INTERRUPT_KEY, FrameTimers
   
 class CPU:
     __slots__ = ['regs', 'PC', 'SP', 'IME', 'ime_scheduled', 'HALT', 'HALT_BUG']
@@ -12,8 +19,45 @@ class CPU:
         self.HALT = False
         self.HALT_BUG = False
 
+class SerialCapture:
+    # Bytes enviados pela porta serial (blargg reporta os resultados por aqui).
+    # Buffer pré-alocado: read() devolve memoryviews (sem cópia) dos bytes novos,
+    # e o buffer nunca é realocado, então as views continuam válidas.
+    __slots__ = ['data', 'write_pos', 'read_pos', 'dropped']
+
+    def __init__(self, capacity=1 << 20):
+        self.data = bytearray(capacity)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.dropped = 0
+
+    def append(self, byte):
+        if self.write_pos < len(self.data):
+            self.data[self.write_pos] = byte
+            self.write_pos += 1
+        else:
+            self.dropped += 1
+
+    def read(self):
+        # Stream: só o que chegou desde a última leitura
+        view = memoryview(self.data)[self.read_pos : self.write_pos]
+        self.read_pos = self.write_pos
+        return view
+
+    def getvalue(self):
+        return memoryview(self.data)[: self.write_pos]
+
+    def contains(self, marker):
+        return self.data.find(marker, 0, self.write_pos) != -1
+
+    def text(self):
+        return self.data[: self.write_pos].decode("latin-1")
+
 class GameBoy:
-    __slots__ = ['CPU', 'Memory', 'cart_rom']
+    __slots__ = ['CPU', 'Memory', 'cart_rom', 'scanline_stats', 'frameskip_stats', 'present_stats', 'pacer',
+                 'serial', 'frame_count', 'cycle_count', 'instruction_count', 'time_stats', 'frame_timers',
+                 'framebuffer', 'rom_checksum', 'rom_bank', 'div_counter', 'tima_counter', 'serial_counter',
+                 'serial_out', 'ppu_mode', 'scanline_counter', 'state_loaded', 'dirty_pages', 'frame_dirty_pages']
     COLORS = [
         (224, 248, 208), # 00: Branco (White)
         (136, 192, 112), # 01: Cinza Claro (Light Gray)
@@ -25,6 +69,62 @@ class GameBoy:
         self.CPU = CPU()
         self.Memory = bytearray(65536)
         self.cart_rom = bytearray(0)
+        self.scanline_stats = [0, 0] # [hits, misses] do cache de scanlines
+        self.frameskip_stats = [0, 0] # [frames desenhados, frames pulados]
+        self.present_stats = [0, 0] # [frames apresentados, frames idênticos não reenviados]
+        self.pacer = None # FramePacer da última execução (velocidade atingida em pacer.achieved_speed)
+        self.serial = SerialCapture() # Saída da porta serial
+        self.frame_count = 0 # Frames emulados desde o load_rom
+        self.cycle_count = 0 # Ciclos emulados desde o load_rom
+        self.instruction_count = 0 # Instruções executadas desde o load_rom
+        # Tempo real acumulado (s): [emulação (CPU, timer, modos da PPU), desenho das linhas, fim de frame
+        # (áudio, apresentação, eventos, input)]. A espera do pacer fica de fora.
+        self.time_stats = [0.0, 0.0, 0.0]
+        self.frame_timers = None # profiler.FrameTimers da última execução (tempo por subsistema)
+
+        # Framebuffer de índices de paleta (0-3), 1 byte por pixel (fica no objeto para
+        # quem inspeciona a tela de fora: testes por hash de tela, benchmarks)
+        self.framebuffer = bytearray(160 * 144)
+
+        # Estado que o run mantém em variáveis locais (timer, serial, MBC, PPU). É copiado para cá
+        # no fim de cada frame e relido no início do run e depois de um load_state.
+        self.rom_checksum = 0 # CRC32 da ROM (confere se um save state é desta ROM)
+        self.reset_core_state()
+        self.state_loaded = False # load_state durante o run: recarrega as locais no fim do frame
+
+        # Páginas de 256 bytes da memória escritas (1 = suja). O write_byte marca dirty_pages;
+        # no fim de cada frame o run copia para frame_dirty_pages (o que o frame escreveu) e limpa.
+        # Quem consome no fim do frame (on_frame, rewind, hash de estado) lê frame_dirty_pages e
+        # acumula por conta própria, então vários consumidores convivem com um bitmap só.
+        self.dirty_pages = bytearray(b"\x01" * 256)
+        self.frame_dirty_pages = bytearray(b"\x01" * 256)
+
+    def reset_core_state(self):
+        self.rom_bank = 1         # Banco mapeado em 0x4000-0x7FFF
+        self.div_counter = 0
+        self.tima_counter = 0
+        self.serial_counter = 0
+        self.serial_out = 0
+        self.ppu_mode = 2         # OAM Search
+        self.scanline_counter = 0
+
+    def save_state(self, out=None):
+        # Snapshot binário (savestate.py); vale no fim de um frame (on_frame) ou fora do run
+        return savestate.save_state(self, out)
+
+    def load_state(self, data):
+        savestate.load_state(self, data)
+
+    def fork_many(self, n, inputs, frames=60, regions=None, jobs=None):
+        # n futuros a partir do estado atual, um processo filho (os.fork) por ramo (branching.py)
+        import branching
+        return branching.fork_many(self, n, inputs, frames, regions or branching.DEFAULT_REGIONS, jobs)
+
+    def scanline_hit_rate(self):
+        # Fração das scanlines que foram reaproveitadas do frame anterior
+        hits, misses = self.scanline_stats
+        total = hits + misses
+        return hits / total if total else 0.0
 
     def load_rom(self, filename):
         print(f"Carregando ROM: {filename}...")
@@ -33,6 +133,13 @@ class GameBoy:
                 data = f.read()
                 
             self.cart_rom = data
+            self.rom_checksum = zlib.crc32(data)
+            self.reset_core_state()
+            self.dirty_pages[:] = b"\x01" * 256
+            self.frame_count = 0
+            self.cycle_count = 0
+            self.instruction_count = 0
+            self.time_stats[:] = [0.0, 0.0, 0.0]
             limit = min(len(data), 0x8000)
             self.Memory[:limit] = data[:limit]
             
@@ -68,7 +175,27 @@ class GameBoy:
             print("Erro: Arquivo não encontrado.")
             exit()
 
-    def run(self):
+    def run(self, threaded_present=False, frameskip=0, speed=1.0, fast_forward_speed=None, scale_filter=None,
+            audio=None, headless=False, max_frames=None, on_frame=None, input_script=None, opcode_trace=None,
+            profiler=None, frame_timers=None, guest_profiler=None, call_tracker=None, show_stats=False,
+            disable_gc=False, rewind=None, input_source=None):
+        # headless=True: sem janela (testes, benchmarks, batch)
+        # input_script: lista de (frame, joypad) ordenada por frame; substitui o teclado
+        #               (o joypad vale a partir daquele frame, no formato do presenter.joypad)
+        # input_source: fonte de input (inputs.py) com read(frame, presenter) -> joypad; ex: gravação de movie.
+        #               Padrão: input_script se houver, senão o teclado
+        # opcode_trace: bytearray que recebe (opcode, byte seguinte, PC baixo, PC alto) de cada
+        #               instrução executada (stream real para o benchmark de estratégias de dispatch)
+        # profiler: profiler.OpcodeProfiler (execuções e custo no host de cada opcode)
+        # frame_timers: profiler.FrameTimers (tempo de cada subsistema por frame, médias e percentis)
+        # guest_profiler: profiler.GuestProfiler (amostra o PC emulado + banco da ROM a cada N ciclos)
+        # call_tracker: profiler.CallStackTracker (pilha sombra de CALL/RST/interrupção -> ciclos por caminho)
+        # disable_gc: gc.freeze() depois de preparar a execução e GC cíclico desligado até o fim do run
+        # rewind: rewind.RewindBuffer (captura o estado no fim dos frames; segurar R volta no tempo)
+        # show_stats: mostra o tempo por subsistema no título da janela (cria um FrameTimers se preciso)
+        # max_frames: para depois de N frames
+        # on_frame(gb): chamado no fim de cada frame (com o estado da CPU sincronizado em gb.CPU);
+        #               se retornar True, a execução para (ex: "Passed" apareceu na serial)
         cpu = self.CPU
         mem = self.Memory
         regs = cpu.regs
@@ -80,65 +207,226 @@ class GameBoy:
         halt_bug = cpu.HALT_BUG
 
         # Variáveis locais para o Timer (precisão e velocidade)
-        div_counter = 0
-        tima_counter = 0
+        div_counter = self.div_counter
+        tima_counter = self.tima_counter
+
+        # Porta serial: transferência com clock interno = 8 bits a 8192 Hz = 4096 ciclos
+        # Sem cabo de link, o byte recebido é 0xFF
+        SERIAL_TRANSFER_CYCLES = 4096
+        serial_counter = self.serial_counter # Ciclos até terminar a transferência atual (0 = parada)
+        serial_out = self.serial_out
+        serial = self.serial
+
+        # Banco da ROM mapeado em 0x4000-0x7FFF (o load_rom mapeia o banco 1)
+        rom_bank = self.rom_bank
 
         # PPU
-        pygame.init()
         SCALE = 3
-        gb_surface = pygame.Surface((160, 144), depth=8)
-        gb_surface.set_palette([
-            (224, 248, 208), # 0: Branco
-            (136, 192, 112), # 1: Cinza Claro
-            (52, 104, 86),   # 2: Cinza Escuro
-            (8, 24, 32)      # 3: Preto
-        ])
-        window = pygame.display.set_mode((160 * SCALE, 144 * SCALE))
-        pygame.display.set_caption("GB-Py | Tetris a Alta Velocidade")
-        clock = pygame.time.Clock()
-        CYCLES_PER_FRAME = 70224 # 4194304 / 60
-
-        mode = 2 # Começa em OAM Search
-        scanline_counter = 0
-        framebuffer = [0] * (160 * 144)
+        mode = self.ppu_mode # 2 (OAM Search) depois do load_rom
+        scanline_counter = self.scanline_counter
+        self.state_loaded = False
+
+        # Framebuffer de índices de paleta (0-3), 1 byte por pixel.
+        # A superfície do Pygame é criada EM CIMA desse bytearray (frombuffer),
+        # então o que a PPU escreve já está na superfície: nenhuma cópia por frame.
+        framebuffer = self.framebuffer
+        blank_line = bytes(160)
+
+        # Apresentação (janela, escala, flip, eventos)
+        # threaded_present=True: uma thread separada apresenta os frames e a emulação nunca espera por ela
+        # scale_filter: None (pygame.transform.scale) ou filtro NumPy: "nearest", "scale2x", "scale3x", "scale4x"
+        if headless:
+            presenter = HeadlessPresenter()
+        elif threaded_present:
+            presenter = ThreadedPresenter(framebuffer, SCALE, scale_filter)
+        else:
+            presenter = InlinePresenter(framebuffer, SCALE, scale_filter)
+        if input_source is None:
+            input_source = ScriptInput(input_script) if input_script is not None else KeyboardInput()
+        read_input = input_source.read
+        CYCLES_PER_FRAME = 70224 # 4194304 / 59.73
+
+        # APU: só é emulado se houver uma saída de áudio
+        # (apu.MixerSink() no frontend, apu.WaveSink/RawSink em headless, apu.NullSink() sem saída).
+        # Sem saída, 0xFF10-0xFF3F continuam sendo memória comum.
+        apu = None
+        if audio is not None:
+            from apu import APU # NumPy só é necessário com áudio
+            apu = APU(mem, audio)
+
+        # Ritmo dos frames: speed=1.0 tempo real (59.73 Hz), 2.0/4.0... multiplicador,
+        # None = sem limite. Segurar TAB usa fast_forward_speed (None = sem limite).
+        # speed="audio": ritmo ditado pelo áudio (precisa de audio=apu.DeviceSink())
+        if speed == "audio" and not hasattr(audio, "wait_for_room"):
+            print("speed='audio' precisa de audio=apu.DeviceSink(); usando o ritmo por tempo (1.0x)")
+            speed = 1.0
+        if speed == "audio":
+            pacer = AudioPacer(audio)
+        else:
+            pacer = FramePacer(speed, fast_forward_speed)
+        self.pacer = pacer
+
+        # --- FRAMESKIP ---
+        # A PPU continua avançando modos, LY, STAT e VBlank normalmente;
+        # só o desenho das linhas e a apresentação são pulados.
+        # frameskip=N: desenha 1 a cada N+1 frames
+        # frameskip="auto": pula quando o tempo real fica atrás do orçamento de 70224 ciclos
+        FRAME_TIME = CYCLES_PER_FRAME / 4194304 # ~16.74 ms (59.73 Hz)
+        MAX_AUTO_SKIP = 8 # Nunca pula mais que isso seguidos (a tela não congela)
+        auto_frameskip = frameskip == "auto"
+        fixed_frameskip = 0 if auto_frameskip else int(frameskip)
+        skip_render = False
+        skipped_in_row = 0
+        lag = 0.0
+        last_frame_time = time.perf_counter()
+        frameskip_stats = self.frameskip_stats
+
+        # Frames idênticos ao último apresentado não são reenviados (sem escala, blit e flip)
+        presented_digest = None
+        presented_lcd = None
+        present_stats = self.present_stats
+
+        # --- CACHE DE SCANLINES (Dirty Detection) ---
+        # Cada escrita que MUDA a VRAM incrementa um contador de versão.
+        # Uma linha só é redesenhada se a assinatura dela (registradores + versões
+        # de tudo o que ela lê) for diferente da do frame anterior.
+        tile_row_versions = [0] * 3072 # 0x8000-0x97FF: 1 contador por linha de tile (2 bytes)
+        map_row_versions = [0] * 64    # 0x9800-0x9FFF: 1 contador por linha do tilemap (32 bytes)
+        oam_version = 0                # Só muda se o conteúdo da OAM mudar
+        line_signatures = [None] * 144
+        sprite_lines = None            # Sprites de cada linha (recalculado quando a OAM muda)
+        sprite_lines_key = None
+        line_stats = self.scanline_stats
+        frame_dirty = True # Alguma linha foi redesenhada desde a última apresentação
+
+        # Medição de tempo (2 leituras do relógio por frame + 2 por linha desenhada)
+        perf_counter = time.perf_counter
+        time_stats = self.time_stats
+        render_time = 0.0
+        instructions = self.instruction_count
+
+        # --- MODO INSTRUMENTADO ---
+        # Uma única flag local protege todo o código de medição dentro do loop
+        # (trace de opcodes, profiler de opcodes, tempo por subsistema); desligada, custa só os testes dela.
+        if show_stats and frame_timers is None:
+            frame_timers = FrameTimers()
+        self.frame_timers = frame_timers
+        instrumented = (opcode_trace is not None or profiler is not None or frame_timers is not None
+                        or guest_profiler is not None or call_tracker is not None)
+        perf_counter_ns = time.perf_counter_ns
+        sample_rate = 0 # 0 = não mede tempo dentro do loop
+        if profiler is not None:
+            prof_counts = profiler.counts
+            prof_samples = profiler.samples
+            prof_times = profiler.times
+            sample_rate = profiler.sample_rate
+        elif frame_timers is not None:
+            sample_rate = frame_timers.sample_rate
+        sample_countdown = 1
+        sampling = False
+        prof_t0 = prof_t1 = prof_t2 = prof_t3 = 0
+        prof_slot = 0
+        render_before = 0.0
+
+        # Histograma do GuestProfiler: índice = offset na ROM (banco * 0x4000 + endereço no banco)
+        # ou, fora da ROM, rom_size + (PC - 0x8000)
+        if guest_profiler is not None:
+            guest_profiler.attach(len(self.cart_rom))
+            guest_hist = guest_profiler.histogram
+            guest_interval = guest_profiler.interval
+            guest_countdown = guest_interval
+            rom_size = guest_profiler.rom_size
+
+        # Pilha sombra: cs_sp = SP antes da instrução (CALL tomado = SP caiu 2 com opcode de CALL)
+        if call_tracker is not None:
+            cs_node = call_tracker.node
+            cs_stack = call_tracker.stack
+            cs_callers = call_tracker.callers
+            cs_max_depth = call_tracker.max_depth
+            cs_cycles = call_tracker.cycles
+            cs_child = call_tracker.child
+            cs_sp = sp
+
+        # Acumuladores do frame para o FrameTimers (ns das amostras)
+        ft_iterations = 0
+        ft_samples = 0      # Iterações amostradas (cpu)
+        ft_tail_samples = 0 # Iterações amostradas que passaram pela cauda (timer, ppu)
+        ft_cpu = ft_timer = ft_ppu = 0
+
+        # --- LOOP SEM ACÚMULO DE OBJETOS ---
+        # Em regime, o loop não retém objetos novos. Ainda há objetos de vida curta: os ints > 256
+        # (PC, SP, contadores), a tupla de assinatura de cada scanline desenhada e os floats do
+        # perf_counter. Cópias de memória usam views criadas uma vez aqui, e não slices temporários
+        # (o `gbpy.py alloc` confere os blocos e bytes retidos por frame).
+        # Bancos da ROM (views, sem cópia) para a troca de banco do MBC, copiados direto na view
+        # da área 0x4000-0x7FFF
+        cart_view = memoryview(self.cart_rom)
+        rom_banks = [cart_view[start : start + 0x4000] for start in range(0, len(self.cart_rom) - 0x3FFF, 0x4000)]
+        # Origens possíveis do DMA (0x0000-0xF100, de 256 em 256 bytes) e a OAM
+        mem_view = memoryview(mem)
+        dma_sources = [mem_view[page << 8 : (page << 8) + 160] for page in range(0xF2)]
+        oam_view = mem_view[0xFE00:0xFEA0]
+        bank_view = mem_view[0x4000:0x8000]
+
+        # Bitmap de páginas sujas (bytearrays constantes: atribuir bytes copiaria para um temporário)
+        dirty_pages = self.dirty_pages
+        frame_dirty_pages = self.frame_dirty_pages
+        BANK_PAGES = bytearray(b"\x01" * 64) # 0x4000-0x7FFF numa troca de banco
+        CLEAN_PAGES = bytearray(256)
+
+        # disable_gc: congela os objetos que já existem (ROM, tabelas, caches) e desliga o GC
+        # cíclico durante a emulação (sem pausas de coleta no meio de um frame)
+        if disable_gc:
+            gc.collect()
+            gc.freeze()
+            gc.disable()
 
         print("Iniciando Emulação...")
 
         def dma_transfer(value):
+            nonlocal oam_version
             source = value << 8
-            print(f"DMA INICIADO: Copiando de {source:04X} para FE00") # Descomente para debug
 
             if source > 0xF100: 
                 return
 
-            # Copia 160 bytes para a OAM
-            mem[0xFE00 : 0xFEA0] = mem[source : source + 160]
+            # Views pré-criadas da origem e da OAM: nem a comparação nem a cópia criam objetos
+            # (mem[a:b] = view copiaria a view para um bytearray temporário antes)
+            data_chunk = dma_sources[value]
 
-            # Copia direta usando slice (Cópia segura)
-            # Garante que estamos lendo da memória correta
-            data_chunk = mem[source : source + 160]
-            mem[0xFE00 : 0xFEA0] = data_chunk
+            # A maioria dos jogos faz DMA todo frame, mesmo sem mudar nada.
+            # Só invalida o cache de sprites se o conteúdo for diferente.
+            if oam_view != data_chunk:
+                oam_view[:] = data_chunk
+                oam_version += 1
+                dirty_pages[0xFE] = 1
 
         def write_byte(addr, value):
+            nonlocal oam_version, serial_counter, serial_out, rom_bank
+            dirty_pages[addr >> 8] = 1 # Também marca as escritas de controle do MBC (inofensivo)
             # 1. ROM (0x0000 - 0x7FFF) - Read Only / MBC Control
             if addr < 0x8000:
                 # PROTEÇÃO CRÍTICA:
                 # Só troca de banco se a ROM for maior que 32KB (0x8000 bytes).
                 # dmg-acid2 tem 32KB, então isso IGNORA a escrita e protege a memória.
-                if len(self.cart_rom) > 0x8000:
+                if len(rom_banks) > 2:
                     bank_number = value & 0x1F 
                     if bank_number == 0: bank_number = 1
                     
-                    start_addr_in_cart = bank_number * 0x4000
-                    
                     # Verifica se o banco existe antes de copiar
-                    if start_addr_in_cart + 0x4000 <= len(self.cart_rom):
-                        mem[0x4000:0x8000] = self.cart_rom[start_addr_in_cart : start_addr_in_cart + 0x4000]
+                    if bank_number < len(rom_banks):
+                        bank_view[:] = rom_banks[bank_number]
+                        rom_bank = bank_number
+                        dirty_pages[0x40:0x80] = BANK_PAGES
                 return # Se a ROM for pequena, não faz nada (correto para Acid2)
 
             # 2. VRAM (0x8000 - 0x9FFF)
             elif addr < 0xA000:
-                mem[addr] = value
+                if mem[addr] != value:
+                    mem[addr] = value
+                    # Atualiza a versão do pedaço da VRAM que mudou (cache de scanlines)
+                    if addr < 0x9800: tile_row_versions[(addr - 0x8000) >> 1] += 1
+                    else:             map_row_versions[(addr - 0x9800) >> 5] += 1
                 return
 
             # 3. External RAM (0xA000 - 0xBFFF)
@@ -151,11 +439,14 @@ class GameBoy:
                 mem[addr] = value
                 if addr < 0xE000: mem[addr + 0x2000] = value # Echo Write
                 else:             mem[addr - 0x2000] = value # Write to original
+                dirty_pages[(addr >> 8) ^ 0x20] = 1
                 return
 
             # 5. OAM (0xFE00 - 0xFE9F)
             elif addr < 0xFEA0:
-                mem[addr] = value
+                if mem[addr] != value:
+                    mem[addr] = value
+                    oam_version += 1
                 return
 
             # 6. Unusable (0xFEA0 - 0xFEFF) - BLOQUEAR ESCRITAS AQUI
@@ -170,6 +461,13 @@ class GameBoy:
                     mem[0xFF00] = (current & 0x0F) | (value & 0xF0)
                     return
 
+                elif addr == 0xFF02: # Serial Control
+                    mem[0xFF02] = value | 0x7E # Bits 1-6 não existem (leem 1)
+                    if (value & 0x81) == 0x81: # Start + clock interno: agenda o fim da transferência
+                        serial_counter = SERIAL_TRANSFER_CYCLES
+                        serial_out = mem[0xFF01]
+                    return
+
                 elif addr == 0xFF04: # DIV Reset
                     mem[0xFF04] = 0
                     return
@@ -188,6 +486,11 @@ class GameBoy:
                     mem[0xFF41] = (value & 0xF8) | (current & 0x07)
                     return
 
+                elif 0xFF10 <= addr < 0xFF40 and apu is not None: # APU (som)
+                    # Guarda o ciclo da escrita; a síntese acontece em lote no fim do frame
+                    apu.write(addr, value, cycles_this_frame)
+                    return
+
                 # Outros IOs
                 mem[addr] = value
                 return
@@ -199,6 +502,7 @@ class GameBoy:
         def ppu_update(cycles):
             nonlocal mode
             nonlocal scanline_counter
+            nonlocal render_time
             
             lcdc = mem[0xFF40]
             stat = mem[0xFF41]
@@ -243,7 +547,10 @@ class GameBoy:
                     mode = 0
                     
                     # Desenha a linha ao final do Mode 3 (H-Blank start)
-                    render_scanline(current_ly)
+                    if not skip_render:
+                        t = perf_counter()
+                        render_scanline(current_ly)
+                        render_time += perf_counter() - t
                     
                     # Entrando no Mode 0: Verifica INT Mode 0 (Bit 3)
                     if stat & 0x08:
@@ -294,13 +601,84 @@ class GameBoy:
                 
             return (mode == 1 and current_ly == 144) # Retorna True se acabou de entrar em VBlank (Frame Ready)
         
+        def build_sprite_lines(obj_height):
+            # Para cada linha, quais sprites a cruzam (no máximo 10, na ordem da OAM).
+            # Guarda os 4 bytes de cada sprite e os contadores das linhas de tile que ele lê.
+            lines = [[] for _ in range(144)]
+            for i in range(40):
+                addr = 0xFE00 + (i * 4)
+                oy = mem[addr] - 16
+                tile = mem[addr + 2]
+                flags = mem[addr + 3]
+                if obj_height == 16:
+                    tile &= 0xFE
+
+                for ly in range(max(oy, 0), min(oy + obj_height, 144)):
+                    if len(lines[ly]) >= 10: continue
+
+                    line_in_obj = ly - oy
+                    if flags & 0x40: # Y Flip
+                        line_in_obj = obj_height - 1 - line_in_obj
+                    lines[ly].append((addr, (tile * 8) + line_in_obj))
+
+            # Converte para (bytes dos sprites, índices em tile_row_versions)
+            return [(b"".join(mem[a : a + 4] for a, _ in entries), [v for _, v in entries])
+                    for entries in lines]
+
+        def line_signature(ly, lcdc, scy, scx):
+            nonlocal sprite_lines, sprite_lines_key
+
+            # Background: linha do tilemap + versões das linhas de tile visíveis
+            y_map = (ly + scy) & 0xFF
+            map_row = (32 if (lcdc & 0x08) else 0) + (y_map >> 3)
+            row_addr = 0x9800 + (map_row * 32)
+            line_in_tile = y_map & 7
+            first_col = scx >> 3
+            signed_addr = not (lcdc & 0x10)
+
+            # Contadores só crescem, então a soma muda se qualquer um deles mudar
+            # (o conjunto de tiles é fixo dado map_row_version + SCX na assinatura)
+            tiles_version = 0
+            for i in range(21):
+                tile_idx = mem[row_addr + ((first_col + i) & 31)]
+                if signed_addr and tile_idx < 128:
+                    tile_idx += 256 # Modo 0x8800: 0-127 ficam em 0x9000
+                tiles_version += tile_row_versions[(tile_idx << 3) | line_in_tile]
+
+            # Sprites que cruzam a linha
+            sprites = None
+            if lcdc & 0x02:
+                obj_height = 16 if (lcdc & 0x04) else 8
+                if sprite_lines_key != (oam_version, obj_height):
+                    sprite_lines = build_sprite_lines(obj_height)
+                    sprite_lines_key = (oam_version, obj_height)
+
+                sprite_bytes, sprite_rows = sprite_lines[ly]
+                sprite_version = 0
+                for v in sprite_rows:
+                    sprite_version += tile_row_versions[v]
+                sprites = (sprite_bytes, sprite_version)
+
+            return (lcdc, scy, scx, mem[0xFF47], mem[0xFF48], mem[0xFF49],
+                    mem[0xFF4A], mem[0xFF4B], map_row_versions[map_row], tiles_version, sprites)
+
         def render_scanline(ly):
+            nonlocal frame_dirty
             lcdc = mem[0xFF40]
-            
+            scy = mem[0xFF42]
+            scx = mem[0xFF43]
+
+            # 0. Dirty Detection: se nada que a linha lê mudou, mantém a linha do framebuffer
+            signature = line_signature(ly, lcdc, scy, scx)
+            if line_signatures[ly] == signature:
+                line_stats[0] += 1
+                return
+            line_signatures[ly] = signature
+            line_stats[1] += 1
+            frame_dirty = True
+
             # 1. Background (BG)
             if lcdc & 0x01: # BG Display Enable
-                scy = mem[0xFF42]
-                scx = mem[0xFF43]
                 bgp = mem[0xFF47]
                 
                 y_map = (ly + scy) & 0xFF
@@ -339,8 +717,7 @@ class GameBoy:
                             framebuffer[ly * 160 + x_screen] = color
             else:
                 # Se BG desligado, preenche com cor 0 (Branco)
-                for x in range(160):
-                    framebuffer[ly * 160 + x] = 0
+                framebuffer[ly * 160 : ly * 160 + 160] = blank_line
 
             # 2. Window (Janela)
             # Window é desenhada SOBRE o BG se habilitada (Bit 5) e WX/WY validados
@@ -416,40 +793,22 @@ class GameBoy:
                                 # Marcamos como cor de sprite (podemos adicionar offset para distinguir)
                                 framebuffer[ly * 160 + x_pixel] = color
         
-        # --- PREPARAÇÃO DO LOG ---
-        log_file = open("debug.log", "w")
-        instruction_count = 0
-        MAX_LOGS = 50000 # Grava apenas as primeiras 50 mil instruções
-        logging_active = True
-
         running = True
         while running:
             cycles_this_frame = 0
+            frame_start = perf_counter()
+            render_time = 0.0
 
             while cycles_this_frame < CYCLES_PER_FRAME:
-                # --- 0. GRAVAÇÃO DO LOG ---
-                if logging_active:
-                    # Formata a string de log igual ao BGB (padrão ouro dos emuladores)
-                    # Ex: PC:0100 OP:00 AF:01B0 ...
-                    log_line = (
-                        f"PC:{pc:04X} OP:{mem[pc]:02X} "
-                        f"AF:{regs[7]:02X}{regs[6]:02X} "
-                        f"BC:{regs[0]:02X}{regs[1]:02X} "
-                        f"DE:{regs[2]:02X}{regs[3]:02X} "
-                        f"HL:{regs[4]:02X}{regs[5]:02X} "
-                        f"SP:{sp:04X} "
-                        f"LY:{mem[0xFF44]:02X} " # Importante: Monitorar a linha da tela (LY)
-                        f"LCDC:{mem[0xFF40]:02X} " # Monitorar se o LCD está ligado
-                        f"BGP:{mem[0xFF47]:02X}" # Monitorar a Paleta
-                    )
-                    #log_file.write(log_line)
-                    
-                    #instruction_count += 1
-                    #if instruction_count >= MAX_LOGS:
-                        #print("Limite de log atingido. Parando gravação para performance.")
-                        #logging_active = False
-                        #log_file.close()
-                    #print(log_line)
+                if instrumented and sample_rate:
+                    # Amostra 1 a cada sample_rate iterações
+                    prof_slot = SLOT_HALTED
+                    ft_iterations += 1
+                    sample_countdown -= 1
+                    sampling = sample_countdown == 0
+                    if sampling:
+                        sample_countdown = sample_rate
+                        prof_t0 = perf_counter_ns()
 
                 # --- 1. TRATAMENTO DE INTERRUPÇÕES (Dispatch) ---
                 ie = mem[0xFFFF]    # Interrupt Enable (Quais interrupções o jogo QUER ouvir)
@@ -486,6 +845,22 @@ class GameBoy:
                     pc = vector
 
                     write_byte(0xFF0F, if_reg & ~(1 << bit_to_clear))
+                    if instrumented:
+                        if call_tracker is not None:
+                            if len(cs_stack) < cs_max_depth:
+                                cs_callers.append(cs_node)
+                                cs_stack.append(sp)
+                                cs_node = cs_child(cs_node, INTERRUPT_KEY | vector)
+                            cs_sp = sp
+                        if profiler is not None:
+                            prof_counts[SLOT_INTERRUPT] += 1
+                        if sampling:
+                            elapsed = perf_counter_ns() - prof_t0
+                            ft_samples += 1
+                            ft_cpu += elapsed
+                            if profiler is not None:
+                                prof_samples[SLOT_INTERRUPT] += 1
+                                prof_times[SLOT_INTERRUPT] += elapsed
                     continue
                 # --- FIM DO TRATAMENTO DE INTERRUPÇÕES ---
             
@@ -503,6 +878,11 @@ class GameBoy:
                         running=False # para parar o emulador
 
                     opcode = mem[pc]
+                    instructions += 1
+                    if instrumented:
+                        if opcode_trace is not None:
+                            opcode_trace.extend((opcode, mem[(pc + 1) & 0xFFFF], pc & 0xFF, pc >> 8))
+                        prof_slot = opcode if opcode != 0xCB else CB_BASE + mem[(pc + 1) & 0xFFFF]
 
                     if halt_bug: halt_bug = False # LÓGICA DO HALT BUG - PC não incrementa
                     else: pc = (pc + 1) & 0xFFFF
@@ -517,7 +897,7 @@ class GameBoy:
                         if z == 0: # Colunas x0 e x8 - NOP, STOP, JR, CALL, RET...
                             
                             if y == 0: # 0x00 - NOP
-                                pass # Apenas gasta os 4 ciclos do fetch padrão
+                                cycles = 4 # Só o fetch
                             
                             elif y == 1: # 0x08 - LD (nn), SP
                                 # Única instrução que salva 16 bits na memória no padrão Little Endian
@@ -536,7 +916,7 @@ class GameBoy:
                                 pc = (pc + 1) & 0xFFFF
                                 # Aqui você poderia setar uma flag 'stopped = True' se quisesse,
                                 # mas para GB clássico ele age quase como um HALT bizarro.
-                                pass 
+                                cycles = 4
 
                             elif y == 3: # 0x18 - JR e8 (Pulo Relativo Incondicional)
                                 offset = mem[pc]; pc = (pc + 1) & 0xFFFF
@@ -1113,12 +1493,12 @@ class GameBoy:
                         # --- GRUPO Z=1: POP & RET ---
                         elif z == 1:
                             q = y & 1
+                            p = y >> 1 # 0=BC, 1=DE, 2=HL, 3=AF (ou RET, RETI, JP HL, LD SP HL)
                             if q == 0: # POP rr (Opcodes C1, D1, E1, F1)
                                 # Recupera da pilha (Little Endian)
                                 low = mem[sp]; sp = (sp + 1) & 0xFFFF
                                 high = mem[sp]; sp = (sp + 1) & 0xFFFF
                                 
-                                p = y >> 1 # 0=BC, 1=DE, 2=HL, 3=AF
                                 if p == 3: # POP AF (Especial!)
                                     regs[7] = high # A
                                     regs[6] = low & 0xF0 # F (Limpa bits 0-3)
@@ -1500,99 +1880,273 @@ class GameBoy:
                         else:
                             pass
                             
-                    cycles_this_frame += cycles
-
-                    # 3. Sincronia (PPU e Timer correm atrás)
-                    div_counter += cycles
-                    while div_counter >= 256:
-                        div_counter -= 256
-                        mem[0xFF04] = (mem[0xFF04] + 1) & 0xFF
+                if instrumented:
+                    if sampling:
+                        prof_t1 = perf_counter_ns()
+                        ft_samples += 1
+                        ft_cpu += prof_t1 - prof_t0
+                    if profiler is not None:
+                        prof_counts[prof_slot] += 1
+                        prof_counts[SLOT_TAIL] += 1
+                        if sampling:
+                            prof_samples[prof_slot] += 1
+                            prof_times[prof_slot] += prof_t1 - prof_t0
+                    if guest_profiler is not None:
+                        guest_countdown -= cycles
+                        if guest_countdown <= 0:
+                            guest_countdown += guest_interval
+                            if pc < 0x4000:   guest_hist[pc] += 1
+                            elif pc < 0x8000: guest_hist[(rom_bank << 14) + pc - 0x4000] += 1
+                            else:             guest_hist[rom_size + pc - 0x8000] += 1
+                    if call_tracker is not None:
+                        # Os ciclos são da rotina em que a instrução rodou (o CALL é do chamador, o RET do chamado)
+                        cs_cycles[cs_node] += cycles
+                        if cs_stack and sp > cs_stack[-1]:
+                            # SP passou do endereço de retorno: o quadro acabou (RET/RETI, POP, LD SP...)
+                            while cs_stack and sp > cs_stack[-1]:
+                                cs_stack.pop()
+                                cs_node = cs_callers.pop()
+                        elif sp == cs_sp - 2 and opcode in CALL_OPCODES and len(cs_stack) < cs_max_depth:
+                            # No limite (ex: RST 38 em loop ao executar 0xFF) o quadro não é empilhado:
+                            # os ciclos ficam no nó atual e o retorno dele não passa do SP do topo
+                            cs_callers.append(cs_node)
+                            cs_stack.append(sp)
+                            cs_node = cs_child(cs_node, (rom_bank << 16 | pc) if 0x4000 <= pc < 0x8000 else pc)
+                        cs_sp = sp
+
+                cycles_this_frame += cycles
+
+                # 3. Sincronia (PPU e Timer correm atrás)
+                div_counter += cycles
+                while div_counter >= 256:
+                    div_counter -= 256
+                    mem[0xFF04] = (mem[0xFF04] + 1) & 0xFF
+                
+                # --- 2. Atualização do TIMA (Controlado pelo TAC) ---
+                tac = mem[0xFF07] # Timer Control
+                
+                # Bit 2 do TAC liga/desliga o Timer
+                if tac & 0x04:
+                    # Descobre a frequência baseada nos bits 1-0
+                    freq_bits = tac & 0x03
+                    threshold = 1024 # Padrão (freq=00 -> 4096Hz -> 1024 ciclos)
                     
-                    # --- 2. Atualização do TIMA (Controlado pelo TAC) ---
-                    tac = mem[0xFF07] # Timer Control
+                    if freq_bits == 1:   threshold = 16   # 262144Hz
+                    elif freq_bits == 2: threshold = 64   # 65536Hz
+                    elif freq_bits == 3: threshold = 256  # 16384Hz
                     
-                    # Bit 2 do TAC liga/desliga o Timer
-                    if tac & 0x04:
-                        # Descobre a frequência baseada nos bits 1-0
-                        freq_bits = tac & 0x03
-                        threshold = 1024 # Padrão (freq=00 -> 4096Hz -> 1024 ciclos)
-                        
-                        if freq_bits == 1:   threshold = 16   # 262144Hz
-                        elif freq_bits == 2: threshold = 64   # 65536Hz
-                        elif freq_bits == 3: threshold = 256  # 16384Hz
-                        
-                        tima_counter += cycles
+                    tima_counter += cycles
+                    
+                    while tima_counter >= threshold:
+                        tima_counter -= threshold
                         
-                        while tima_counter >= threshold:
-                            tima_counter -= threshold
+                        # Incrementa o TIMA (0xFF05)
+                        tima = mem[0xFF05]
+                        if tima == 0xFF:
+                            # OVERFLOW!
+                            mem[0xFF05] = mem[0xFF06] # Recarrega com valor do TMA (Modulo)
                             
-                            # Incrementa o TIMA (0xFF05)
-                            tima = mem[0xFF05]
-                            if tima == 0xFF:
-                                # OVERFLOW!
-                                mem[0xFF05] = mem[0xFF06] # Recarrega com valor do TMA (Modulo)
-                                
-                                # Solicita Interrupção do Timer (Bit 2 do registro IF)
-                                mem[0xFF0F] |= 0x04 
-                            else:
-                                mem[0xFF05] = tima + 1
+                            # Solicita Interrupção do Timer (Bit 2 do registro IF)
+                            mem[0xFF0F] |= 0x04 
+                        else:
+                            mem[0xFF05] = tima + 1
+
+                if instrumented and sampling:
+                    prof_t2 = perf_counter_ns()
+                    render_before = render_time
 
                 # --- 4. Atualização do PPU ---
                 ppu_update(cycles)
 
+                # --- 5. Porta Serial ---
+                if serial_counter:
+                    serial_counter -= cycles
+                    if serial_counter <= 0:
+                        serial_counter = 0
+                        serial.append(serial_out)
+                        mem[0xFF01] = 0xFF     # Nada do outro lado do cabo
+                        mem[0xFF02] &= 0x7F    # Fim da transferência
+                        mem[0xFF0F] |= 0x08    # Serial Interrupt (Bit 3 do IF)
+
+                if instrumented and sampling:
+                    # PPU + serial; o desenho das linhas é medido à parte (render)
+                    prof_t3 = perf_counter_ns() - int((render_time - render_before) * 1e9)
+                    ft_tail_samples += 1
+                    ft_timer += prof_t2 - prof_t1
+                    ft_ppu += prof_t3 - prof_t2
+                    if profiler is not None:
+                        prof_samples[SLOT_TAIL] += 1
+                        prof_times[SLOT_TAIL] += perf_counter_ns() - prof_t1
+
+            emulation_end = perf_counter()
+
+            # Áudio do frame inteiro, sintetizado de uma vez
+            if apu is not None:
+                apu.end_frame(cycles_this_frame)
+            apu_end = perf_counter()
+            present_time = 0.0
+            flip_time = 0.0
+
             # ---------------------------------------------------------
             # PASSO 2: RENDERIZAÇÃO (Apenas 1x a cada 70 mil ciclos)
             # ---------------------------------------------------------
             
-            # Verifica se o LCD está ligado
-            if mem[0xFF40] & 0x80:
-                # TRUQUE DE VELOCIDADE:
-                # Pega a lista 'framebuffer' (que tem ints 0-3), converte para bytes
-                # e joga direto na memória da superfície do Pygame.
-                # Como a superfície é 8-bits e tem paleta, ele já sabe as cores!
-                gb_surface.get_buffer().write(bytes(framebuffer))
-                
-                # Escala e joga na janela
-                scaled_surface = pygame.transform.scale(gb_surface, (160 * SCALE, 144 * SCALE))
-                window.blit(scaled_surface, (0, 0))
+            # Entrega o frame (LCD desligado = tela branca).
+            # Inline: escala + flip aqui mesmo. Threaded: só copia e segue emulando.
+            if skip_render:
+                frameskip_stats[1] += 1
             else:
-                # Tela branca se LCD desligado
-                window.fill((224, 248, 208))
-            
-            pygame.display.flip()
+                frameskip_stats[0] += 1
+                lcd_on = mem[0xFF40] & 0x80
+
+                # Só apresenta se o frame mudou:
+                # 1. Flag da PPU: nenhuma linha redesenhada = framebuffer igual
+                # 2. Se houve linhas redesenhadas, confirma com um CRC32 (~10 us para 23 KB)
+                frame_changed = lcd_on != presented_lcd
+                if frame_dirty:
+                    frame_dirty = False
+                    digest = zlib.crc32(framebuffer)
+                    if digest != presented_digest:
+                        presented_digest = digest
+                        frame_changed = True
+
+                if frame_changed:
+                    presented_lcd = lcd_on
+                    present_stats[0] += 1
+                    t = perf_counter()
+                    presenter.submit(framebuffer, lcd_on)
+                    present_time = perf_counter() - t
+                    flip_time = presenter.flip_time
+                else:
+                    present_stats[1] += 1
+            events_start = perf_counter()
+            presenter.poll()
 
             # ---------------------------------------------------------
             # PASSO 3: INPUT E EVENTOS (Apenas 1x por frame)
             # ---------------------------------------------------------
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-            
-            keys = pygame.key.get_pressed()
-            
-            # (Sua lógica de Joypad 0xFF00 original aqui)
+            if presenter.quit_requested:
+                running = False
+
+            # Snapshot do joypad vindo do presenter (1 = pressionado)
+            # Nibble baixo: A, B, Select, Start. Nibble alto: Direita, Esquerda, Cima, Baixo
+            pressed = read_input(self.frame_count, presenter)
+
             joypad_reg = mem[0xFF00]
             select_buttons = not (joypad_reg & 0x20)
             select_dpad = not (joypad_reg & 0x10)
             
             result = 0xCF 
             if select_buttons:
-                if keys[pygame.K_x]: result &= ~(0x01) # A
-                if keys[pygame.K_z]: result &= ~(0x02) # B
-                if keys[pygame.K_BACKSPACE]: result &= ~(0x04) # Select
-                if keys[pygame.K_RETURN]: result &= ~(0x08) # Start
+                result &= ~(pressed & 0x0F)
             if select_dpad:
-                if keys[pygame.K_RIGHT]: result &= ~(0x01)
-                if keys[pygame.K_LEFT]:  result &= ~(0x02)
-                if keys[pygame.K_UP]:    result &= ~(0x04)
-                if keys[pygame.K_DOWN]:  result &= ~(0x08)
+                result &= ~(pressed >> 4)
             mem[0xFF00] = result
+
+            frame_end = perf_counter()
+            time_stats[0] += emulation_end - frame_start - render_time
+            time_stats[1] += render_time
+            time_stats[2] += frame_end - emulation_end
+
+            if frame_timers is not None:
+                # Partes por instrução: média das amostras (sem o custo da leitura do relógio)
+                # vezes o número de iterações do frame
+                overhead = frame_timers.timer_overhead
+                scale = ft_iterations / ft_samples / 1e6 if ft_samples else 0.0
+                tail_scale = ft_iterations / ft_tail_samples / 1e6 if ft_tail_samples else 0.0
+                frame_timers.add((
+                    max(0.0, ft_cpu - overhead * ft_samples) * scale,
+                    max(0.0, ft_timer - overhead * ft_tail_samples) * tail_scale,
+                    max(0.0, ft_ppu - overhead * ft_tail_samples) * tail_scale,
+                    render_time * 1e3,
+                    (apu_end - emulation_end) * 1e3,
+                    (present_time - flip_time) * 1e3,
+                    flip_time * 1e3,
+                    (frame_end - events_start) * 1e3,
+                    (frame_end - frame_start) * 1e3,
+                ))
+                ft_iterations = ft_samples = ft_tail_samples = 0
+                ft_cpu = ft_timer = ft_ppu = 0
+
+            if call_tracker is not None:
+                call_tracker.node = cs_node
             
-            # Controle de FPS
-            clock.tick(60)
+            # Controle de FPS (e velocidade atingida no título da janela)
+            if pacer.wait(presenter.fast_forward):
+                if show_stats:
+                    presenter.set_status(f"{pacer.achieved_speed:.0%} | {frame_timers.format_caption()}")
+                else:
+                    presenter.set_status(f"{pacer.achieved_speed:.0%}")
+
+            self.frame_count += 1
+            self.cycle_count += cycles_this_frame
+            self.instruction_count = instructions
+            if max_frames is not None and self.frame_count >= max_frames:
+                running = False
+
+            # Sincroniza as locais com os objetos (CPU, timer, serial, MBC, PPU): on_frame e
+            # save_state enxergam o estado exato do fim do frame
+            cpu.PC = pc; cpu.SP = sp; cpu.IME = ime; cpu.ime_scheduled = ime_scheduled
+            cpu.HALT = halted; cpu.HALT_BUG = halt_bug
+            self.div_counter = div_counter; self.tima_counter = tima_counter
+            self.serial_counter = serial_counter; self.serial_out = serial_out
+            self.rom_bank = rom_bank; self.ppu_mode = mode; self.scanline_counter = scanline_counter
+            # Páginas escritas no frame. A 0xFF (I/O) muda todo frame fora do write_byte (DIV, LY, STAT)
+            dirty_pages[0xFF] = 1
+            frame_dirty_pages[:] = dirty_pages
+            dirty_pages[:] = CLEAN_PAGES
+            if on_frame is not None:
+                if on_frame(self):
+                    running = False
 
-        pygame.quit()
+            if rewind is not None:
+                if presenter.rewind: rewind.step_back(self)
+                else:                rewind.capture(self)
+
+            if self.state_loaded:
+                # load_state no meio do run (on_frame, rewind): relê as locais e invalida os caches
+                self.state_loaded = False
+                pc = cpu.PC; sp = cpu.SP; ime = cpu.IME; ime_scheduled = cpu.ime_scheduled
+                halted = cpu.HALT; halt_bug = cpu.HALT_BUG
+                div_counter = self.div_counter; tima_counter = self.tima_counter
+                serial_counter = self.serial_counter; serial_out = self.serial_out
+                rom_bank = self.rom_bank; mode = self.ppu_mode; scanline_counter = self.scanline_counter
+                instructions = self.instruction_count
+                line_signatures[:] = [None] * 144
+                sprite_lines_key = None
+                presented_digest = None
+                frame_dirty = True
+
+            # Decide se o PRÓXIMO frame será desenhado
+            # (um frame do loop cobre exatamente um frame da PPU, então cada frame desenhado é completo)
+            if auto_frameskip:
+                now = time.perf_counter()
+                lag += (now - last_frame_time) - (pacer.frame_time or FRAME_TIME)
+                last_frame_time = now
+                if lag < 0.0: lag = 0.0 # Estar adiantado não vira crédito
+                elif lag > FRAME_TIME * MAX_AUTO_SKIP: lag = FRAME_TIME * MAX_AUTO_SKIP
+
+                skip_render = lag > FRAME_TIME and skipped_in_row < MAX_AUTO_SKIP
+            elif fixed_frameskip:
+                skip_render = skipped_in_row < fixed_frameskip
+
+            if skip_render: skipped_in_row += 1
+            else:           skipped_in_row = 0
+
+        presenter.close()
+        if audio is not None:
+            audio.close()
+        if disable_gc:
+            gc.enable()
+            gc.unfreeze()
+
+        # Salva o estado (uma nova chamada de run continua de onde parou)
+        cpu.PC = pc; cpu.SP = sp; cpu.IME = ime; cpu.ime_scheduled = ime_scheduled
+        cpu.HALT = halted; cpu.HALT_BUG = halt_bug
+        self.div_counter = div_counter; self.tima_counter = tima_counter
+        self.serial_counter = serial_counter; self.serial_out = serial_out
+        self.rom_bank = rom_bank; self.ppu_mode = mode; self.scanline_counter = scanline_counter
                
 
 if __name__ == "__main__":
@@ -1600,4 +2154,11 @@ if __name__ == "__main__":
     #gb.load_rom("roms/gb-test-roms-master/cpu_instrs/cpu_instrs.gb")
     gb.load_rom("roms/dmg-acid2.gb")
     #gb.load_rom("roms/Tetris.gb")
-    gb.run()
\ No newline at end of file
+    import pygame
+    audio = None
+    try:
+        from apu import MixerSink # Som precisa de NumPy e de um dispositivo de áudio
+        audio = MixerSink()
+    except (ImportError, pygame.error) as e:
+        print(f"Sem som ({e}): rodando em silêncio")
+    gb.run(audio=audio)
\ No newline at end of file
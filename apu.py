@@ -0,0 +1,530 @@
+import time
+import wave
+import numpy as np
+
+# --- APU (Áudio) ---
+# Em vez de emular o som ciclo a ciclo (caríssimo em Python), as escritas nos
+# registradores 0xFF10-0xFF3F são guardadas com o ciclo em que aconteceram.
+# No fim do frame o APU reaplica essas escritas em ordem e, entre uma e outra
+# (e entre os ticks do frame sequencer), os 4 canais têm parâmetros constantes:
+# cada trecho é sintetizado de uma vez com NumPy.
+
+CPU_FREQ = 4194304
+SAMPLE_RATE = 44100
+CYCLES_PER_SAMPLE = CPU_FREQ / SAMPLE_RATE # ~95.1
+FRAME_SEQUENCER_PERIOD = 8192              # 512 Hz
+
+# Padrões de duty (12.5%, 25%, 50%, 75%), 8 passos cada, +1/-1
+DUTY_TABLE = np.array([
+    [-1, -1, -1, -1, -1, -1, -1, +1],
+    [+1, -1, -1, -1, -1, -1, -1, +1],
+    [+1, -1, -1, -1, -1, +1, +1, +1],
+    [-1, +1, +1, +1, +1, +1, +1, -1],
+], dtype=np.float32)
+
+NOISE_DIVISORS = [8, 16, 32, 48, 64, 80, 96, 112]
+
+
+def _lfsr_sequence(width_7bit):
+    # Sequência completa do LFSR do canal de ruído (periódica: 32767 ou 127 passos)
+    # +1 quando o bit 0 é 0 (saída alta), -1 caso contrário
+    lfsr = 0x7FFF
+    length = 127 if width_7bit else 32767
+    out = np.empty(length, dtype=np.float32)
+    for i in range(length):
+        out[i] = 1.0 if not (lfsr & 1) else -1.0
+        xor = (lfsr & 1) ^ ((lfsr >> 1) & 1)
+        lfsr = (lfsr >> 1) | (xor << 14)
+        if width_7bit:
+            lfsr = (lfsr & ~0x40) | (xor << 6)
+    return out
+
+LFSR_15 = _lfsr_sequence(False)
+LFSR_7 = _lfsr_sequence(True)
+
+
+class Channel:
+    # Estado de um canal (usado pelos 4; cada um só usa os campos que precisa)
+    __slots__ = ['enabled', 'dac', 'length', 'length_enable', 'freq', 'duty', 'phase',
+                 'volume', 'env_initial', 'env_add', 'env_period', 'env_timer',
+                 'sweep_period', 'sweep_negate', 'sweep_shift', 'sweep_timer', 'sweep_enabled', 'shadow_freq',
+                 'wave_shift', 'noise_shift', 'noise_7bit', 'noise_divisor']
+
+    def __init__(self):
+        self.enabled = False
+        self.dac = False
+        self.length = 0
+        self.length_enable = False
+        self.freq = 0
+        self.duty = 2
+        self.phase = 0.0 # Posição na forma de onda (0-1) ou passos do LFSR no ruído
+        self.volume = 0
+        self.env_initial = 0
+        self.env_add = False
+        self.env_period = 0
+        self.env_timer = 0
+        self.sweep_period = 0
+        self.sweep_negate = False
+        self.sweep_shift = 0
+        self.sweep_timer = 0
+        self.sweep_enabled = False
+        self.shadow_freq = 0
+        self.wave_shift = 4
+        self.noise_shift = 0
+        self.noise_7bit = False
+        self.noise_divisor = 8
+
+
+class NullSink:
+    # Emula o APU sem tocar nem gravar nada (ex: testes headless)
+    rate_ratio = 1.0 # Multiplicador de ciclos por amostra (só o DeviceSink ajusta)
+
+    def write(self, samples):
+        pass
+
+    def close(self):
+        pass
+
+
+class WaveSink:
+    # Grava um .wav estéreo 16-bit
+    rate_ratio = 1.0
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE):
+        self.file = wave.open(path, "wb")
+        self.file.setnchannels(2)
+        self.file.setsampwidth(2)
+        self.file.setframerate(sample_rate)
+
+    def write(self, samples):
+        self.file.writeframes(samples.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class RawSink:
+    # PCM cru: int16 estéreo intercalado (L, R, L, R...)
+    rate_ratio = 1.0
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+
+    def write(self, samples):
+        self.file.write(samples.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class MixerSink:
+    # Toca pelo pygame.mixer: um Sound por frame na fila do canal.
+    # Se a fila já estiver cheia (emulação adiantada), o frame de áudio é descartado.
+    rate_ratio = 1.0
+
+    def __init__(self, sample_rate=SAMPLE_RATE, buffer=1024):
+        import pygame
+        self.pygame = pygame
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=2, buffer=buffer)
+        self.channel = pygame.mixer.Channel(0)
+
+    def write(self, samples):
+        sound = self.pygame.mixer.Sound(buffer=samples.tobytes())
+        if not self.channel.get_busy():
+            self.channel.play(sound)
+        elif self.channel.get_queue() is None:
+            self.channel.queue(sound)
+
+    def close(self):
+        self.pygame.mixer.quit()
+
+
+class AudioRingBuffer:
+    # Ring buffer de amostras estéreo int16, um produtor (emulação) e um consumidor
+    # (callback do áudio), SEM lock: cada lado só escreve no seu próprio contador
+    # (write_pos / read_pos, sempre crescentes) e só depois de copiar os dados.
+    __slots__ = ['data', 'capacity', 'write_pos', 'read_pos', 'underruns', 'overruns']
+
+    def __init__(self, capacity):
+        self.data = np.zeros((capacity, 2), dtype=np.int16)
+        self.capacity = capacity
+        self.write_pos = 0
+        self.read_pos = 0
+        self.underruns = 0
+        self.overruns = 0
+
+    def fill(self):
+        return self.write_pos - self.read_pos
+
+    def push(self, samples):
+        # Lado da emulação: o que não couber é descartado
+        n = min(len(samples), self.capacity - (self.write_pos - self.read_pos))
+        if n < len(samples):
+            self.overruns += 1
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start : start + first] = samples[:first]
+        self.data[: n - first] = samples[first:n]
+        self.write_pos += n
+
+    def pop_into(self, out):
+        # Lado do callback: completa com silêncio se faltar amostra (underrun)
+        wanted = len(out)
+        n = min(wanted, self.write_pos - self.read_pos)
+        start = self.read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start : start + first]
+        out[first:n] = self.data[: n - first]
+        if n < wanted:
+            out[n:] = 0
+            self.underruns += 1
+        self.read_pos += n
+
+
+class DeviceSink:
+    # Saída de áudio de baixa latência: o callback do SDL puxa amostras do ring buffer.
+    # Dynamic Rate Control: conforme o nível do buffer, os ciclos por amostra do APU
+    # são ajustados em no máximo +-max_rate_delta (0.5%, inaudível). Buffer cheio ->
+    # menos amostras por frame; buffer vazio -> mais. Assim o buffer fica perto do alvo
+    # sem estalos e sem a latência crescer, mesmo com o relógio do áudio diferente do nosso.
+    # Com speed="audio" no GameBoy.run, a emulação espera o buffer esvaziar até o alvo
+    # (wait_for_room) em vez de dormir por tempo: o áudio dita o ritmo.
+    __slots__ = ['ring', 'device', 'target_fill', 'max_rate_delta', 'rate_ratio', 'wait_timeout']
+
+    def __init__(self, sample_rate=SAMPLE_RATE, latency=0.05, chunksize=512, max_rate_delta=0.005):
+        import pygame
+        from pygame._sdl2 import audio as sdl_audio, sdl2
+        pygame.init()
+        # O pygame.init() abre o dispositivo padrão para o mixer: fecha o mixer e reabre só o
+        # subsistema de áudio do SDL, que o AudioDevice usa
+        pygame.mixer.quit()
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+
+        self.target_fill = int(sample_rate * latency)
+        self.ring = AudioRingBuffer(self.target_fill * 4)
+        self.max_rate_delta = max_rate_delta
+        self.rate_ratio = 1.0
+        self.wait_timeout = latency * 4 # Espera máxima no wait_for_room (alguns períodos do buffer)
+
+        device_name = sdl_audio.get_audio_device_names(False)[0]
+        self.device = sdl_audio.AudioDevice(
+            devicename=device_name, iscapture=False, frequency=sample_rate,
+            audioformat=sdl_audio.AUDIO_S16, numchannels=2, chunksize=chunksize,
+            allowed_changes=0, callback=self._callback)
+        self.device.pause(0)
+
+    def _callback(self, device, stream):
+        # Thread do áudio: preenche o stream direto (view int16 estéreo do buffer do SDL)
+        self.ring.pop_into(np.frombuffer(stream, dtype=np.int16).reshape(-1, 2))
+
+    def write(self, samples):
+        self.ring.push(samples)
+
+        # DRC: nível relativo ao alvo (-1 vazio, 0 no alvo, +1 no dobro do alvo)
+        level = (self.ring.fill() - self.target_fill) / self.target_fill
+        if level > 1.0: level = 1.0
+        elif level < -1.0: level = -1.0
+        self.rate_ratio = 1.0 + self.max_rate_delta * level
+
+    def has_room(self):
+        return self.ring.fill() <= self.target_fill
+
+    def wait_for_room(self):
+        # Bloqueia até o buffer baixar para o alvo (o callback vai consumindo).
+        # Devolve False se ele não baixar em wait_timeout: o callback parou de consumir
+        # (dispositivo pausado ou perdido) e esperar mais travaria a emulação.
+        deadline = time.perf_counter() + self.wait_timeout
+        while self.ring.fill() > self.target_fill:
+            if time.perf_counter() >= deadline:
+                return False
+            time.sleep(0.0005)
+        return True
+
+    def close(self):
+        self.device.pause(1)
+        self.device.close()
+
+
+class APU:
+    __slots__ = ['mem', 'sink', 'channels', 'events', 'powered', 'seq_step', 'seq_next',
+                 'sample_pos', 'cycles_per_sample', 'left', 'right']
+
+    def __init__(self, mem, sink):
+        self.mem = mem
+        self.sink = sink
+        self.channels = [Channel(), Channel(), Channel(), Channel()]
+        self.events = [] # (ciclo no frame, endereço, valor)
+        self.powered = True
+        self.seq_step = 0
+        self.seq_next = FRAME_SEQUENCER_PERIOD # Ciclo (no frame atual) do próximo tick do frame sequencer
+        self.sample_pos = 0.0 # Ciclo (no frame atual) da próxima amostra
+        self.cycles_per_sample = CYCLES_PER_SAMPLE
+        self.left = None
+        self.right = None
+
+        # Estado pós-BIOS
+        for addr, value in ((0xFF26, 0xF1), (0xFF24, 0x77), (0xFF25, 0xF3),
+                            (0xFF10, 0x80), (0xFF11, 0xBF), (0xFF12, 0xF3), (0xFF14, 0xBF)):
+            mem[addr] = value
+        self._apply(0xFF12, 0xF3)
+        self._apply(0xFF11, 0xBF)
+        self.channels[0].enabled = True # NR52 = F1: canal 1 ligado (volume 0, o "ding" do boot já acabou)
+
+    # --- Lado da CPU (chamado pelo write_byte) ---
+
+    def write(self, addr, value, cycle):
+        mem = self.mem
+        if addr >= 0xFF30: # Wave RAM (sempre acessível)
+            mem[addr] = value
+            self.events.append((cycle, addr, value))
+            return
+
+        if addr == 0xFF26: # NR52: só o bit 7 (power) é gravável
+            powered = bool(value & 0x80)
+            if not powered:
+                for a in range(0xFF10, 0xFF26):
+                    mem[a] = 0
+                mem[0xFF26] = 0x70
+            else:
+                mem[0xFF26] = 0xF0 | (mem[0xFF26] & 0x0F)
+            self.events.append((cycle, addr, value))
+            return
+
+        if not (mem[0xFF26] & 0x80): # APU desligado: escritas ignoradas
+            return
+
+        mem[addr] = value
+        self.events.append((cycle, addr, value))
+
+        # Trigger já liga o bit de status no NR52 (a leitura pela CPU é imediata)
+        if value & 0x80 and addr in (0xFF14, 0xFF19, 0xFF1E, 0xFF23):
+            n = (0xFF14, 0xFF19, 0xFF1E, 0xFF23).index(addr)
+            dac_reg = mem[0xFF1A] & 0x80 if n == 2 else mem[(0xFF12, 0xFF17, 0, 0xFF21)[n]] & 0xF8
+            if dac_reg:
+                mem[0xFF26] |= 1 << n
+
+    # --- Fim do frame: reaplica os eventos e sintetiza tudo ---
+
+    def end_frame(self, frame_cycles):
+        # Taxa de reamostragem do frame (ajustada pelo DRC do DeviceSink)
+        cycles_per_sample = CYCLES_PER_SAMPLE * self.sink.rate_ratio
+        self.cycles_per_sample = cycles_per_sample
+
+        # Tempos (em ciclos, relativos ao início do frame) de cada amostra deste frame
+        n = int(np.ceil((frame_cycles - self.sample_pos) / cycles_per_sample))
+        if n < 0: n = 0
+        times = self.sample_pos + np.arange(n) * cycles_per_sample
+        self.left = np.zeros(n, dtype=np.float32)
+        self.right = np.zeros(n, dtype=np.float32)
+
+        cursor = 0
+        events = self.events
+        i = 0
+        while True:
+            # Próximo acontecimento: escrita de registrador ou tick do frame sequencer
+            next_event = events[i][0] if i < len(events) else frame_cycles
+            if self.seq_next <= next_event and self.seq_next < frame_cycles:
+                self._synth(times, cursor, self.seq_next)
+                cursor = self.seq_next
+                self._frame_sequencer()
+                self.seq_next += FRAME_SEQUENCER_PERIOD
+            elif i < len(events):
+                cycle, addr, value = events[i]
+                self._synth(times, cursor, cycle)
+                cursor = max(cursor, cycle)
+                self._apply(addr, value)
+                i += 1
+            else:
+                break
+        self._synth(times, cursor, frame_cycles)
+        events.clear()
+
+        self.seq_next -= frame_cycles
+        self.sample_pos = self.sample_pos + n * cycles_per_sample - frame_cycles
+
+        # Status dos canais no NR52 (ex: comprimento expirado durante o frame)
+        status = 0
+        for idx, ch in enumerate(self.channels):
+            if ch.enabled: status |= 1 << idx
+        self.mem[0xFF26] = (self.mem[0xFF26] & 0xF0) | status
+
+        # Mixagem final: 4 canais * volume 15 * master 8 -> int16
+        stereo = np.empty((n, 2), dtype=np.int16)
+        stereo[:, 0] = self.left * (32767 / (4 * 15 * 8))
+        stereo[:, 1] = self.right * (32767 / (4 * 15 * 8))
+        self.sink.write(stereo)
+
+    def _synth(self, times, c0, c1):
+        # Sintetiza as amostras no intervalo de ciclos [c0, c1) com parâmetros constantes
+        if c1 <= c0:
+            return
+        i0 = int(np.searchsorted(times, c0))
+        i1 = int(np.searchsorted(times, c1))
+        elapsed = c1 - c0
+
+        mem = self.mem
+        nr50 = mem[0xFF24]
+        nr51 = mem[0xFF25]
+        vol_left = ((nr50 >> 4) & 7) + 1
+        vol_right = (nr50 & 7) + 1
+        t = times[i0:i1] - c0 # Ciclos desde o início do trecho
+
+        for idx, ch in enumerate(self.channels):
+            if not ch.enabled or not ch.dac:
+                continue
+
+            if idx < 2: # Quadradas: 8 passos de (2048 - freq) * 4 ciclos
+                waveform_cycles = (2048 - ch.freq) * 32
+                if i1 > i0 and ch.volume:
+                    steps = ((ch.phase + t / waveform_cycles) * 8).astype(np.int64) & 7
+                    out = DUTY_TABLE[ch.duty][steps] * ch.volume
+                else:
+                    out = None
+                ch.phase = (ch.phase + elapsed / waveform_cycles) % 1.0
+
+            elif idx == 2: # Wave: 32 amostras de 4 bits, (2048 - freq) * 2 ciclos cada
+                waveform_cycles = (2048 - ch.freq) * 64
+                if i1 > i0 and ch.wave_shift < 4:
+                    ram = np.frombuffer(bytes(mem[0xFF30:0xFF40]), dtype=np.uint8)
+                    nibbles = np.empty(32, dtype=np.float32)
+                    nibbles[0::2] = ram >> 4
+                    nibbles[1::2] = ram & 0x0F
+                    levels = np.floor(nibbles / (1 << ch.wave_shift)) - (15 >> ch.wave_shift) / 2
+                    steps = ((ch.phase + t / waveform_cycles) * 32).astype(np.int64) & 31
+                    out = levels[steps] * 2
+                else:
+                    out = None
+                ch.phase = (ch.phase + elapsed / waveform_cycles) % 1.0
+
+            else: # Ruído: LFSR pré-calculado, avança 1 passo a cada divisor << shift ciclos
+                if ch.noise_shift >= 14: # Shift 14/15: LFSR não recebe clock
+                    continue
+                period = ch.noise_divisor << ch.noise_shift
+                seq = LFSR_7 if ch.noise_7bit else LFSR_15
+                if i1 > i0 and ch.volume:
+                    steps = (ch.phase + t / period).astype(np.int64) % len(seq)
+                    out = seq[steps] * ch.volume
+                else:
+                    out = None
+                ch.phase = (ch.phase + elapsed / period) % len(seq)
+
+            if out is not None:
+                if nr51 & (0x10 << idx): self.left[i0:i1] += out * vol_left
+                if nr51 & (0x01 << idx): self.right[i0:i1] += out * vol_right
+
+    def _frame_sequencer(self):
+        # 512 Hz, 8 passos: comprimento em 0/2/4/6, sweep em 2/6, envelope em 7
+        step = self.seq_step
+        self.seq_step = (step + 1) & 7
+
+        if not (step & 1):
+            for ch in self.channels:
+                if ch.length_enable and ch.length > 0:
+                    ch.length -= 1
+                    if ch.length == 0:
+                        ch.enabled = False
+
+        if step == 2 or step == 6:
+            ch = self.channels[0]
+            if ch.sweep_enabled and ch.sweep_period:
+                ch.sweep_timer -= 1
+                if ch.sweep_timer <= 0:
+                    ch.sweep_timer = ch.sweep_period
+                    new_freq = self._sweep_calc(ch)
+                    if new_freq <= 2047 and ch.sweep_shift:
+                        ch.shadow_freq = new_freq
+                        ch.freq = new_freq
+                        self._sweep_calc(ch) # Segunda checagem de overflow
+
+        if step == 7:
+            for idx in (0, 1, 3):
+                ch = self.channels[idx]
+                if ch.env_period:
+                    ch.env_timer -= 1
+                    if ch.env_timer <= 0:
+                        ch.env_timer = ch.env_period
+                        if ch.env_add and ch.volume < 15: ch.volume += 1
+                        elif not ch.env_add and ch.volume > 0: ch.volume -= 1
+
+    def _sweep_calc(self, ch):
+        delta = ch.shadow_freq >> ch.sweep_shift
+        new_freq = ch.shadow_freq - delta if ch.sweep_negate else ch.shadow_freq + delta
+        if new_freq > 2047:
+            ch.enabled = False
+        return new_freq
+
+    def _apply(self, addr, value):
+        # Aplica uma escrita de registrador ao estado dos canais (na ordem em que ocorreu)
+        chs = self.channels
+
+        if addr == 0xFF26:
+            self.powered = bool(value & 0x80)
+            if not self.powered:
+                for ch in chs:
+                    ch.enabled = False
+                    ch.dac = False
+            return
+
+        if addr >= 0xFF30: # Wave RAM é lida direto da memória na síntese
+            return
+
+        if addr <= 0xFF14: idx, reg = 0, addr - 0xFF10
+        elif addr <= 0xFF19: idx, reg = 1, addr - 0xFF15
+        elif addr <= 0xFF1E: idx, reg = 2, addr - 0xFF1A
+        elif addr <= 0xFF23: idx, reg = 3, addr - 0xFF1F
+        else: return # NR50/NR51 são lidos direto da memória na síntese
+        ch = chs[idx]
+
+        if reg == 0: # NR10 (sweep) / NR30 (DAC do wave)
+            if idx == 0:
+                ch.sweep_period = (value >> 4) & 7
+                ch.sweep_negate = bool(value & 0x08)
+                ch.sweep_shift = value & 7
+            elif idx == 2:
+                ch.dac = bool(value & 0x80)
+                if not ch.dac: ch.enabled = False
+
+        elif reg == 1: # NRx1: duty + comprimento
+            if idx == 2:
+                ch.length = 256 - value
+            else:
+                ch.length = 64 - (value & 0x3F)
+                if idx < 2: ch.duty = value >> 6
+
+        elif reg == 2: # NRx2: envelope (NR32: volume do wave)
+            if idx == 2:
+                ch.wave_shift = (4, 0, 1, 2)[(value >> 5) & 3]
+            else:
+                ch.env_initial = value >> 4
+                ch.env_add = bool(value & 0x08)
+                ch.env_period = value & 7
+                ch.dac = bool(value & 0xF8)
+                if not ch.dac: ch.enabled = False
+
+        elif reg == 3: # NRx3: frequência (bits baixos) / NR43: parâmetros do ruído
+            if idx == 3:
+                ch.noise_shift = value >> 4
+                ch.noise_7bit = bool(value & 0x08)
+                ch.noise_divisor = NOISE_DIVISORS[value & 7]
+            else:
+                ch.freq = (ch.freq & 0x700) | value
+
+        elif reg == 4: # NRx4: trigger, length enable, frequência (bits altos)
+            ch.length_enable = bool(value & 0x40)
+            if idx != 3:
+                ch.freq = (ch.freq & 0xFF) | ((value & 7) << 8)
+
+            if value & 0x80: # Trigger
+                ch.enabled = ch.dac
+                if ch.length == 0:
+                    ch.length = 256 if idx == 2 else 64
+                ch.phase = 0.0
+                if idx != 2:
+                    ch.volume = ch.env_initial
+                    ch.env_timer = ch.env_period
+                if idx == 0:
+                    ch.shadow_freq = ch.freq
+                    ch.sweep_timer = ch.sweep_period or 8
+                    ch.sweep_enabled = bool(ch.sweep_period or ch.sweep_shift)
+                    if ch.sweep_shift:
+                        self._sweep_calc(ch)
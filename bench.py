@@ -0,0 +1,368 @@
+import contextlib
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from frontend import BUTTONS
+
+# Benchmark de ponta a ponta: cada workload dá boot numa ROM headless, sem limite de
+# velocidade, com uma sequência de input fixa (mesmos frames, mesmos botões), então
+# duas execuções emulam exatamente o mesmo trabalho.
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROMS_DIR = os.path.join(ROOT_DIR, "roms")
+
+# Histórico local: uma linha JSON por execução da suíte (commit, Python, máquina, amostras)
+HISTORY_FILE = os.path.join(ROOT_DIR, "bench_history.jsonl")
+
+# Métricas comparadas pelo compare (maior = melhor)
+COMPARE_METRICS = ("fps", "ips")
+# O teste t precisa de pelo menos 2 amostras de cada lado; uma base gravada com
+# `bench --save` usa SAVE_REPEAT repetições por padrão
+MIN_SAMPLES = 2
+SAVE_REPEAT = 3
+
+# t de Student bicaudal 95% para df = 1..30 (acima disso, aproximação normal)
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def press(frame, *buttons, hold=4):
+    # Aperta os botões no frame dado e solta depois de `hold` frames
+    mask = 0
+    for b in buttons:
+        mask |= BUTTONS[b]
+    return [(frame, mask), (frame + hold, 0)]
+
+
+def script(*presses):
+    return sorted(event for p in presses for event in p)
+
+
+# nome: (ROM, frames, input_script)
+# Os scripts seguem o caminho do jogo no hardware, mas no núcleo atual Tetris e Zelda não
+# chegam a desenhar nada (framebuffer em branco nos frames medidos, igual na base gravada):
+# o que eles medem está no comentário de cada um. Só pokemon e acid2 passam pela PPU de verdade.
+WORKLOADS = {
+    # Roteiro: título -> seleção de tipo -> partida. Hoje fica na inicialização com o LCD
+    # desligado (laço em 0x0200-0x02F0): CPU pura, sem trabalho de PPU
+    "tetris": ("Tetris.gb", 600,
+               script(press(150, "start"), press(200, "start"), press(240, "start"),
+                      press(300, "a"), press(330, "left"), press(360, "a"), press(400, "right"))),
+    # Roteiro: intro -> tela de arquivos -> criação de nome. Hoje cai num RST 38 sem fim
+    # (executando 0xFF) antes da intro: mede o despacho de RST e a escrita na pilha
+    "zelda": ("Legend of Zelda, The - Link's Awakening (USA, Europe) (Rev 2).gb", 600,
+              script(press(200, "start"), press(260, "start"), press(320, "a"), press(380, "a"))),
+    # Intro da Game Freak / Gengar x Nidorino -> título -> menu (desenha, com HALT entre os frames)
+    "pokemon": ("Pokemon Blue.gb", 600,
+                script(press(300, "start"), press(400, "start"), press(460, "a"))),
+    # PPU: janela, sprites, LYC (a CPU passa o tempo em HALT)
+    "acid2": ("dmg-acid2.gb", 300, []),
+    # Só CPU: ALU, loads, pulos (pouco trabalho de PPU)
+    "cpu_instrs": (os.path.join("gb-test-roms-master", "cpu_instrs", "cpu_instrs.gb"), 600, []),
+}
+
+
+def run_workload(name, frames=None):
+    from CPU import GameBoy
+
+    rom, default_frames, input_script = WORKLOADS[name]
+    frames = frames or default_frames
+
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(os.path.join(ROMS_DIR, rom))
+        start = time.perf_counter()
+        gb.run(headless=True, speed=None, max_frames=frames, input_script=input_script)
+        wall = time.perf_counter() - start
+
+    emulation, render, frame_end = gb.time_stats
+    return {
+        "workload": name,
+        "frames": gb.frame_count,
+        "cycles": gb.cycle_count,
+        "instructions": gb.instruction_count,
+        "wall": wall,
+        "fps": gb.frame_count / wall,
+        "mhz": gb.cycle_count / wall / 1e6,
+        "ips": gb.instruction_count / wall,
+        "speed": gb.cycle_count / wall / 4194304, # 1.0 = tempo real do DMG
+        "time_cpu": emulation,
+        "time_ppu": render,
+        "time_present": frame_end,
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return out + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run_suite(names=None, frames=None, repeat=1, progress=None):
+    # repeat > 1: cada workload roda várias vezes (amostras para o intervalo de confiança).
+    # As repetições são intercaladas (A B C A B C...) para o ruído da máquina se espalhar.
+    names = list(names or WORKLOADS)
+    results = []
+    for _ in range(repeat):
+        for name in names:
+            result = run_workload(name, frames)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {"env": environment(), "repeat": repeat, "results": results}
+
+
+def summarize(results):
+    # Média das repetições de cada workload (na ordem em que aparecem)
+    grouped = {}
+    for r in results:
+        grouped.setdefault(r["workload"], []).append(r)
+    summary = []
+    for name, runs in grouped.items():
+        avg = dict(runs[0])
+        for key, value in runs[0].items():
+            if isinstance(value, float):
+                avg[key] = sum(r[key] for r in runs) / len(runs)
+        summary.append(avg)
+    return summary
+
+
+def samples(report, workload, metric):
+    return [r[metric] for r in report["results"] if r["workload"] == workload]
+
+
+# --- Histórico ---
+
+def save_history(report, path=HISTORY_FILE):
+    with open(path, "a") as f:
+        f.write(json.dumps(report) + "\n")
+
+
+def load_history(path=HISTORY_FILE):
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_entry(history, commit):
+    # Última entrada de um commit (prefixo)
+    for entry in reversed(history):
+        if entry["env"]["commit"] and entry["env"]["commit"].startswith(commit):
+            return entry
+    return None
+
+
+def find_baseline(history, env, commit=None):
+    # Última entrada da mesma máquina e versão do Python; com `commit`, a última daquele
+    # commit (prefixo), senão a última de um commit diferente do atual
+    for entry in reversed(history):
+        e = entry["env"]
+        if e["machine"] != env["machine"] or e["python"] != env["python"]:
+            continue
+        if commit is not None:
+            if e["commit"] and e["commit"].startswith(commit):
+                return entry
+        elif e["commit"] != env["commit"]:
+            return entry
+    return None
+
+
+# --- Estatística ---
+
+def t_critical(df):
+    if df < 1:
+        return float("inf")
+    if df <= len(T_95):
+        return T_95[int(df) - 1]
+    return 2.000 if df <= 120 else 1.960
+
+
+def mean_ci(values):
+    # (média, meia-largura do intervalo de 95%)
+    n = len(values)
+    mean = sum(values) / n
+    if n < 2:
+        return mean, float("inf")
+    var = sum((v - mean) ** 2 for v in values) / (n - 1)
+    return mean, t_critical(n - 1) * math.sqrt(var / n)
+
+
+def welch_significant(base, new):
+    # Teste t de Welch (variâncias diferentes) a 95%: a diferença das médias é real?
+    n1, n2 = len(base), len(new)
+    if n1 < 2 or n2 < 2:
+        return False
+    m1, m2 = sum(base) / n1, sum(new) / n2
+    v1 = sum((v - m1) ** 2 for v in base) / (n1 - 1)
+    v2 = sum((v - m2) ** 2 for v in new) / (n2 - 1)
+    se2 = v1 / n1 + v2 / n2
+    if se2 == 0.0:
+        return m1 != m2
+    t = (m2 - m1) / math.sqrt(se2)
+    df = se2 ** 2 / ((v1 / n1) ** 2 / (n1 - 1) + (v2 / n2) ** 2 / (n2 - 1))
+    return abs(t) > t_critical(df)
+
+
+def compare(base, new, threshold=0.02):
+    # Compara duas execuções da suíte, workload a workload.
+    # Regressão = queda estatisticamente significativa E maior que `threshold` (2%).
+    rows = []
+    base_names = {r["workload"] for r in base["results"]}
+    for name in dict.fromkeys(r["workload"] for r in new["results"]):
+        if name not in base_names:
+            continue
+        for metric in COMPARE_METRICS:
+            a = samples(base, name, metric)
+            b = samples(new, name, metric)
+            base_mean, base_ci = mean_ci(a)
+            new_mean, new_ci = mean_ci(b)
+            change = (new_mean - base_mean) / base_mean if base_mean else 0.0
+            significant = welch_significant(a, b) and abs(change) > threshold
+            if min(len(a), len(b)) < MIN_SAMPLES: verdict = "POUCAS AMOSTRAS"
+            elif not significant: verdict = "="
+            elif change < 0:      verdict = "REGRESSÃO"
+            else:                 verdict = "melhora"
+            rows.append({"workload": name, "metric": metric, "base": base_mean, "base_ci": base_ci,
+                         "new": new_mean, "new_ci": new_ci, "change": change, "verdict": verdict})
+    return rows
+
+
+def format_compare(rows, base_env, new_env):
+    lines = [f"base: {base_env['commit']} ({base_env['date']})  ->  novo: {new_env['commit']} ({new_env['date']})",
+             f"{'WORKLOAD':<11} {'MÉTRICA':<7} {'BASE':>20} {'NOVO':>20} {'MUDANÇA':>8}  VEREDITO"]
+    for r in rows:
+        base = f"{r['base']:.1f} ± {r['base_ci']:.1f}"
+        new = f"{r['new']:.1f} ± {r['new_ci']:.1f}"
+        lines.append(f"{r['workload']:<11} {r['metric']:<7} {base:>20} {new:>20} {r['change']:>+8.1%}  {r['verdict']}")
+    return "\n".join(lines)
+
+
+def format_table(results):
+    lines = [f"{'WORKLOAD':<11} {'FRAMES':>6} {'FPS':>7} {'MHZ':>6} {'VELOC.':>7} {'INSTR/S':>9} "
+             f"{'CPU':>6} {'PPU':>6} {'APRES.':>6}"]
+    for r in results:
+        total = r["time_cpu"] + r["time_ppu"] + r["time_present"] or 1.0
+        lines.append(f"{r['workload']:<11} {r['frames']:>6} {r['fps']:>7.1f} {r['mhz']:>6.3f} {r['speed']:>7.1%} "
+                     f"{r['ips']:>9.0f} {r['time_cpu'] / total:>6.1%} {r['time_ppu'] / total:>6.1%} "
+                     f"{r['time_present'] / total:>6.1%}")
+    return "\n".join(lines)
+
+
+# --- Alocações do loop ---
+
+# Limites padrão do `gbpy.py alloc` (média por frame, depois do aquecimento)
+ALLOC_THRESHOLD = 1024   # bytes retidos
+ALLOC_MAX_BLOCKS = 0.5   # blocos retidos (1 objeto retido por frame já falha)
+
+
+def allocation_profile(rom, frames=120, warmup=60, input_script=None, disable_gc=False, top=10):
+    # Roda a ROM sob tracemalloc e mede, em cada frame depois do aquecimento (caches de tiles e
+    # scanlines cheios):
+    #   blocos: variação de sys.getallocatedblocks() (objetos que o frame deixou vivos)
+    #   bytes retidos e pico acima do início do frame (tracemalloc)
+    # Nenhum dos dois conta o que é criado e liberado dentro do mesmo frame (ints do loop,
+    # tuplas de assinatura das scanlines, floats do perf_counter): o CPython não expõe o número
+    # de alocações. O que a medição pega é o loop acumulando objetos, e a lista de linhas onde
+    # os blocos cresceram aponta o responsável.
+    import tracemalloc
+    from array import array
+    from CPU import GameBoy
+
+    # Pré-alocados e indexados pelo frame: a própria medição não deixa blocos vivos
+    size = warmup + frames + 1
+    blocks = array("q", bytes(8 * size))
+    retained = array("q", bytes(8 * size))
+    transient = array("q", bytes(8 * size))
+    state = {"base": 0, "snapshot": None}
+    # Só o código do emulador entra no relatório (a própria medição fica de fora)
+    ours = [tracemalloc.Filter(True, os.path.join(ROOT_DIR, "*")), tracemalloc.Filter(False, __file__)]
+
+    def on_frame(gb):
+        frame = gb.frame_count
+        current, peak = tracemalloc.get_traced_memory()
+        retained[frame] = current - state["base"]
+        transient[frame] = peak - state["base"]
+        if frame == warmup:
+            state["snapshot"] = tracemalloc.take_snapshot().filter_traces(ours)
+        tracemalloc.reset_peak()
+        state["base"] = tracemalloc.get_traced_memory()[0]
+        blocks[frame] = sys.getallocatedblocks() # Por último: o snapshot já conta como base
+
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(rom)
+        tracemalloc.start()
+        try:
+            gb.run(headless=True, speed=None, max_frames=warmup + frames, input_script=input_script,
+                   on_frame=on_frame, disable_gc=disable_gc)
+            end = tracemalloc.take_snapshot().filter_traces(ours)
+        finally:
+            tracemalloc.stop()
+
+    last = gb.frame_count
+    measured = max(last - warmup, 1)
+    block_deltas = [blocks[f] - blocks[f - 1] for f in range(warmup + 1, last + 1)]
+    transient = transient[warmup + 1 : last + 1]
+    growth = []
+    if state["snapshot"] is not None:
+        growth = [s for s in end.compare_to(state["snapshot"], "lineno") if s.count_diff > 0 or s.size_diff > 0]
+        growth.sort(key=lambda s: (s.count_diff, s.size_diff), reverse=True)
+        growth = growth[:top]
+    return {
+        "frames": last - warmup,
+        "blocks_per_frame": (blocks[last] - blocks[warmup]) / measured,
+        "blocks_max": max(block_deltas, default=0),
+        "retained_per_frame": sum(retained[warmup + 1 : last + 1]) / measured,
+        "transient_mean": sum(transient) / measured,
+        "transient_max": max(transient, default=0),
+        "worst_frame": warmup + 1 + transient.index(max(transient)) if transient else None,
+        # (arquivo:linha, bytes a mais, blocos a mais) entre o fim do aquecimento e o fim
+        "growth": [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size_diff, s.count_diff) for s in growth],
+    }
+
+
+def allocations_ok(result, threshold=ALLOC_THRESHOLD, max_blocks=ALLOC_MAX_BLOCKS):
+    # Médias por frame: um frame isolado pode reconstruir um cache (ex: sprites por linha quando
+    # a OAM muda) sem ser acúmulo de regime
+    return result["blocks_per_frame"] <= max_blocks and result["retained_per_frame"] <= threshold
+
+
+def format_allocations(result, threshold=ALLOC_THRESHOLD, max_blocks=ALLOC_MAX_BLOCKS):
+    ok = allocations_ok(result, threshold, max_blocks)
+    lines = [f"{result['frames']} frames medidos",
+             f"blocos retidos por frame: {result['blocks_per_frame']:>9.2f} (máximo {result['blocks_max']})",
+             f"bytes retidos por frame:  {result['retained_per_frame']:>9.1f}",
+             f"pico transitório (média): {result['transient_mean']:>9.1f} bytes",
+             f"pico transitório (máx.):  {result['transient_max']:>9d} bytes (frame {result['worst_frame']})",
+             f"limite: {max_blocks} blocos e {threshold} bytes retidos por frame -> {'OK' if ok else 'FALHOU'}",
+             "(objetos criados e liberados no mesmo frame não entram na conta)"]
+    if result["growth"]:
+        lines.append("Onde a memória cresceu:")
+        for where, size, count in result["growth"]:
+            lines.append(f"  {count:>6} blocos {size:>9} bytes  {os.path.relpath(where, ROOT_DIR)}")
+    return "\n".join(lines)
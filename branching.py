@@ -0,0 +1,85 @@
+import contextlib
+import gc
+import hashlib
+import os
+import pickle
+
+# Ramificação de um estado em vários futuros (busca de rotas, manipulação de RNG).
+# Cada ramo é um processo filho criado com os.fork: ele herda a memória do pai em
+# copy-on-write (ROM, RAM, caches), então não há serialização nem reconstrução do estado.
+# O filho roda headless o próprio input e devolve só o resultado pelo pipe.
+
+# (início, tamanho) das regiões devolvidas por padrão: WRAM e HRAM
+DEFAULT_REGIONS = ((0xC000, 0x2000), (0xFF80, 0x7F))
+
+
+def run_branch(gb, input_script, frames, regions):
+    # Executa no filho. input_script: [(frame, joypad)] com frames relativos ao ponto do fork
+    start = gb.frame_count
+    script = [(start + frame, joypad) for frame, joypad in input_script]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.run(headless=True, speed=None, max_frames=start + frames, input_script=script)
+    mem = gb.Memory
+    return {
+        "frames": gb.frame_count - start,
+        "regions": [bytes(mem[addr : addr + size]) for addr, size in regions],
+        "screen_hash": hashlib.sha1(gb.framebuffer).hexdigest()[:16],
+        "pc": gb.CPU.PC,
+        "error": None,
+    }
+
+
+def _spawn(gb, index, input_script, frames, regions):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Filho: nunca volta para o código do pai (os._exit pula atexit, finally e o pygame)
+        status = 0
+        try:
+            os.close(read_fd)
+            try:
+                result = run_branch(gb, input_script, frames, regions)
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+                status = 1
+            with os.fdopen(write_fd, "wb") as pipe:
+                pipe.write(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def _collect(index, pid, read_fd):
+    with os.fdopen(read_fd, "rb") as pipe:
+        data = pipe.read()
+    os.waitpid(pid, 0)
+    result = pickle.loads(data) if data else {"error": "o processo filho terminou sem resultado"}
+    result["index"] = index
+    return result
+
+
+def fork_many(gb, n, inputs, frames, regions=DEFAULT_REGIONS, jobs=None):
+    # n ramos a partir do estado atual de gb (fora do run ou num on_frame).
+    # inputs: lista com n input scripts, ou função índice -> input script.
+    # Devolve os resultados na ordem dos ramos.
+    if not hasattr(os, "fork"):
+        raise OSError("fork_many precisa de os.fork (Linux/macOS)")
+    jobs = jobs or os.cpu_count() or 1
+    script_for = inputs if callable(inputs) else inputs.__getitem__
+
+    # Congela os objetos atuais: o GC do filho não os percorre, então as páginas deles
+    # continuam compartilhadas com o pai
+    gc.freeze()
+    results = []
+    running = []
+    try:
+        for index in range(n):
+            if len(running) >= jobs:
+                results.append(_collect(*running.pop(0)))
+            running.append((index, *_spawn(gb, index, script_for(index), frames, regions)))
+        while running:
+            results.append(_collect(*running.pop(0)))
+    finally:
+        gc.unfreeze()
+    return results
@@ -0,0 +1,242 @@
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Runner de conformidade: roda as ROMs de teste headless, em paralelo (1 processo por ROM),
+# e decide passou/falhou por:
+#   1. Saída serial do blargg ("Passed" / "Failed")
+#   2. Protocolo de memória do blargg: assinatura DE B0 61 em 0xA001, resultado em 0xA000
+#      (0x80 = rodando, 0 = passou) e texto em 0xA004 (ROMs que não usam a serial)
+#   3. Hash da tela (dmg-acid2), comparado com o de referência em roms/screen_hashes.json
+#      (gerado da imagem oficial com `gbpy test --acid2-reference reference-dmg.png`)
+# Um "JR -2" (18 FE) no PC indica que a ROM terminou: se nada acima deu veredito, falhou.
+
+ROMS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roms")
+BLARGG_DIR = os.path.join(ROMS_DIR, "gb-test-roms-master")
+SCREEN_HASHES_FILE = os.path.join(ROMS_DIR, "screen_hashes.json")
+
+# (padrão glob, limite de frames emulados, modo)
+# O limite cobre o tempo da ROM no hardware real com folga (cpu_instrs individuais levam até ~10 s)
+SUITES = [
+    (os.path.join(BLARGG_DIR, "cpu_instrs", "individual", "*.gb"), 3600, "blargg"),
+    (os.path.join(BLARGG_DIR, "instr_timing", "instr_timing.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "mem_timing", "individual", "*.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "mem_timing-2", "rom_singles", "*.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "halt_bug.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "interrupt_time", "interrupt_time.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "oam_bug", "rom_singles", "*.gb"), 1800, "blargg"),
+    (os.path.join(BLARGG_DIR, "dmg_sound", "rom_singles", "*.gb"), 1800, "blargg"),
+    (os.path.join(ROMS_DIR, "dmg-acid2.gb"), 120, "screen"), # Roda em loop (ei/halt): compara a tela no fim
+]
+
+BLARGG_SIGNATURE = b"\xDE\xB0\x61"
+
+# ROMs que testam o som: rodam com o APU emulado (apu.NullSink, sem saída)
+AUDIO_SUITES = ("dmg_sound/",)
+
+ACID2_ROM = "dmg-acid2.gb"
+
+# Limite de tempo real por ROM: algumas ROMs travam o núcleo dentro de um frame
+# (HALT com LCD desligado), então max_frames sozinho não basta
+DEFAULT_TIMEOUT = 300
+
+
+class RomTimeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise RomTimeout()
+
+
+def find_roms(suites=SUITES, name_filter=None):
+    # Lista de (caminho, limite de frames, modo), na ordem das suítes
+    roms = []
+    for pattern, frames, mode in suites:
+        for path in sorted(glob.glob(pattern)):
+            if name_filter and name_filter not in rom_name(path):
+                continue
+            roms.append((path, frames, mode))
+    return roms
+
+
+def rom_name(path):
+    # Nome curto relativo à pasta roms (ex: cpu_instrs/individual/01-special.gb)
+    return os.path.relpath(path, ROMS_DIR).replace(os.sep, "/").replace("gb-test-roms-master/", "")
+
+
+def screen_hash(framebuffer):
+    return hashlib.sha1(framebuffer).hexdigest()[:16]
+
+
+def reference_hash_from_image(path):
+    # Hash de referência a partir de uma imagem 160x144 do hardware (ex: img/reference-dmg.png
+    # do dmg-acid2): os tons, do mais claro ao mais escuro, viram os índices 0-3 do framebuffer
+    import pygame
+
+    image = pygame.image.load(path)
+    if image.get_size() != (160, 144):
+        raise ValueError(f"{path}: {image.get_size()[0]}x{image.get_size()[1]} (esperado 160x144)")
+    colors = [tuple(image.get_at((x, y)))[:3] for y in range(144) for x in range(160)]
+    shades = sorted(set(colors), key=sum, reverse=True)
+    if len(shades) == 4:
+        index = {color: i for i, color in enumerate(shades)}
+    else:
+        # Nem todos os tons aparecem: quantiza a luminância (FF, AA, 55, 00)
+        index = {color: 3 - round(sum(color) / 3 / 85) for color in shades}
+    return screen_hash(bytes(index[color] for color in colors))
+
+
+def load_screen_hashes():
+    try:
+        with open(SCREEN_HASHES_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_screen_hashes(hashes):
+    with open(SCREEN_HASHES_FILE, "w") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def blargg_memory_result(mem):
+    # (terminou, código, texto) do protocolo de memória, ou None se a ROM não usa
+    if mem[0xA001:0xA004] != BLARGG_SIGNATURE:
+        return None
+    code = mem[0xA000]
+    if code == 0x80:
+        return None # Ainda rodando
+    end = mem.find(0, 0xA004, 0xC000)
+    return code, mem[0xA004 : end if end != -1 else 0xC000].decode("latin-1")
+
+
+def run_rom(path, frames, mode, expected_hash=None, timeout=DEFAULT_TIMEOUT):
+    # Roda UMA ROM (dentro de um processo do pool) e devolve o resultado como dict
+    from CPU import GameBoy
+
+    gb = GameBoy()
+    audio = None
+    if rom_name(path).startswith(AUDIO_SUITES):
+        from apu import NullSink
+        audio = NullSink()
+    verdict = {"status": None, "detail": ""}
+
+    def check(gb):
+        serial = gb.serial
+        if mode == "blargg":
+            if serial.contains(b"Passed"):
+                verdict["status"] = "PASS"
+                return True
+            if serial.contains(b"Failed"):
+                verdict["status"] = "FAIL"
+                return True
+            result = blargg_memory_result(gb.Memory)
+            if result is not None:
+                code, text = result
+                verdict["status"] = "PASS" if code == 0 else "FAIL"
+                verdict["detail"] = text
+                return True
+
+        # JR -2: a ROM parou num laço infinito, não vai acontecer mais nada
+        pc = gb.CPU.PC
+        mem = gb.Memory
+        if mem[pc] == 0x18 and mem[(pc + 1) & 0xFFFF] == 0xFE:
+            verdict["detail"] = f"JR -2 em {pc:04X}"
+            return True
+        return False
+
+    # SIGALRM só existe no Unix; no Windows vale apenas o limite de frames
+    use_alarm = timeout and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.alarm(timeout)
+
+    start = time.perf_counter()
+    try:
+        # Descarta o banner do load_rom e do run (o resultado vem da serial, da memória e da tela)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            gb.load_rom(path)
+            gb.run(headless=True, speed=None, max_frames=frames, on_frame=check, audio=audio)
+    except RomTimeout:
+        verdict["status"] = "TIMEOUT"
+        verdict["detail"] = f"{timeout}s sem terminar o frame {gb.frame_count + 1}"
+    except Exception as e:
+        verdict["status"] = "ERROR"
+        verdict["detail"] = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+    wall = time.perf_counter() - start
+
+    digest = screen_hash(gb.framebuffer)
+    status = verdict["status"]
+    detail = verdict["detail"]
+    if status is None:
+        if mode == "screen":
+            stopped = f" ({detail})" if detail else ""
+            if expected_hash is None:
+                status = "NO REF"
+                detail = f"tela {digest}{stopped}"
+            elif digest == expected_hash:
+                status = "PASS"
+            else:
+                status = "FAIL"
+                detail = f"tela {digest} != {expected_hash}{stopped}"
+        elif detail: # JR -2 sem resultado
+            status = "FAIL"
+        else:
+            status = "TIMEOUT"
+            detail = f"{frames} frames"
+
+    if not detail:
+        # Última linha não vazia da serial (ex: "Failed #3", "Passed")
+        lines = [line for line in gb.serial.text().splitlines() if line.strip()]
+        detail = lines[-1].strip() if lines else ""
+
+    return {
+        "rom": rom_name(path),
+        "status": status,
+        "detail": detail,
+        "frames": gb.frame_count,
+        "cycles": gb.cycle_count,
+        "wall": wall,
+        "serial": gb.serial.text(),
+        "screen_hash": digest,
+    }
+
+
+def run_suite(roms, jobs=None, progress=None, timeout=DEFAULT_TIMEOUT):
+    # Roda todas as ROMs num pool de processos. Devolve os resultados na ordem de `roms`.
+    hashes = load_screen_hashes()
+    results = {}
+    # As ROMs com limite maior entram primeiro (o pool termina mais cedo)
+    order = sorted(roms, key=lambda r: -r[1])
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = {pool.submit(run_rom, path, frames, mode, hashes.get(rom_name(path)), timeout): path
+                   for path, frames, mode in order}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if progress is not None:
+                progress(result)
+    return [results[path] for path, _, _ in roms]
+
+
+def format_table(results):
+    name_width = max([len(r["rom"]) for r in results] + [3])
+    lines = [f"{'ROM':<{name_width}}  {'STATUS':<7} {'TEMPO':>8} {'FRAMES':>7} {'CICLOS':>12}  DETALHE"]
+    for r in results:
+        lines.append(f"{r['rom']:<{name_width}}  {r['status']:<7} {r['wall']:>7.1f}s {r['frames']:>7} "
+                     f"{r['cycles']:>12}  {r['detail']}")
+
+    passed = sum(1 for r in results if r["status"] == "PASS")
+    total_wall = sum(r["wall"] for r in results)
+    lines.append(f"\n{passed}/{len(results)} passaram | {total_wall:.1f}s de CPU somados nos processos")
+    return "\n".join(lines)
@@ -0,0 +1,262 @@
+import json
+import platform
+import struct
+import sys
+import time
+
+# Benchmark de estratégias de dispatch com opcodes REAIS.
+# O teste.py compara if/elif e match/case com 7 valores aleatórios uniformes, mas a
+# distribuição real de opcodes de um jogo é bem diferente (poucos opcodes dominam).
+#
+# 1. record: roda uma ROM headless e grava o stream (opcode, operando, PC) executado
+# 2. run: reexecuta o stream em cada estratégia e mede ns/instrução
+#
+# Todas as estratégias executam o MESMO corpo por opcode (um trabalho pequeno nos
+# registradores, definido em op_body), então a diferença medida é só o custo do dispatch.
+# O replay não importa o núcleo (nem o Pygame): dá para rodar o mesmo stream em
+# várias versões do Python.
+
+STREAM_MAGIC = b"GBOP"
+STREAM_HEADER = struct.Struct("<4sI") # magic, número de instruções
+
+# Opcodes que terminam um bloco básico (JR, JP, CALL, RET, RETI, RST, HALT, STOP)
+BLOCK_END = {0x18, 0x20, 0x28, 0x30, 0x38, 0xC2, 0xC3, 0xCA, 0xD2, 0xDA, 0xE9,
+             0xC4, 0xCC, 0xCD, 0xD4, 0xDC, 0xC0, 0xC8, 0xC9, 0xD0, 0xD8, 0xD9,
+             0xC7, 0xCF, 0xD7, 0xDF, 0xE7, 0xEF, 0xF7, 0xFF, 0x76, 0x10}
+
+
+def record(rom, frames=120, input_script=None):
+    # Stream de 4 bytes por instrução: opcode, byte seguinte, PC baixo, PC alto
+    import contextlib
+    import os
+    from CPU import GameBoy
+
+    trace = bytearray()
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(rom)
+        gb.run(headless=True, speed=None, max_frames=frames, input_script=input_script, opcode_trace=trace)
+    return bytes(trace)
+
+
+def save_stream(path, stream):
+    with open(path, "wb") as f:
+        f.write(STREAM_HEADER.pack(STREAM_MAGIC, len(stream) // 4))
+        f.write(stream)
+
+
+def load_stream(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, count = STREAM_HEADER.unpack_from(data)
+    if magic != STREAM_MAGIC:
+        raise ValueError(f"{path} não é um stream de opcodes")
+    return data[STREAM_HEADER.size : STREAM_HEADER.size + count * 4]
+
+
+def op_body(op, operand="operand"):
+    # Corpo de cada opcode: proporcional à classe da instrução (INC, LD r,r, ALU, imediato/CB)
+    x = op >> 6
+    y = (op >> 3) & 7
+    z = op & 7
+    if op == 0xCB:
+        return f"r = {operand} & 7; regs[r] = ((regs[r] << 1) | (regs[r] >> 7)) & 0xFF"
+    if x == 0:
+        return f"regs[{y}] = (regs[{y}] + 1) & 0xFF"
+    if x == 1:
+        return f"regs[{y}] = regs[{z}]"
+    if x == 2:
+        return f"regs[7] = (regs[7] + regs[{z}]) & 0xFF"
+    return f"regs[{y}] = {operand}"
+
+
+def _compile(source, name, namespace=None):
+    namespace = {} if namespace is None else namespace
+    exec(compile(source, f"<dispatch:{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+# --- Estratégias: cada uma devolve run(ops, operands, regs) ---
+
+def build_baseline():
+    # Só o laço (custo de iterar o stream, descontado das outras)
+    def run(ops, operands, regs):
+        for opcode, operand in zip(ops, operands):
+            pass
+    return run
+
+
+def build_if_chain():
+    # Igual ao núcleo: decodifica x/y/z e desce x -> z -> y em if/elif
+    lines = ["def run(ops, operands, regs):",
+             "    for opcode, operand in zip(ops, operands):",
+             "        x = opcode >> 6",
+             "        y = (opcode >> 3) & 7",
+             "        z = opcode & 7"]
+    for x in range(4):
+        lines.append(f"        {'if' if x == 0 else 'elif'} x == {x}:")
+        for z in range(8):
+            lines.append(f"            {'if' if z == 0 else 'elif'} z == {z}:")
+            for y in range(8):
+                lines.append(f"                {'if' if y == 0 else 'elif'} y == {y}:")
+                lines.append(f"                    {op_body((x << 6) | (y << 3) | z)}")
+    return _compile("\n".join(lines), "run")
+
+
+def build_match():
+    if sys.version_info < (3, 10):
+        return None
+    lines = ["def run(ops, operands, regs):",
+             "    for opcode, operand in zip(ops, operands):",
+             "        match opcode:"]
+    for op in range(256):
+        lines.append(f"            case {op}:")
+        lines.append(f"                {op_body(op)}")
+    return _compile("\n".join(lines), "run")
+
+
+def _handlers():
+    # Uma função por opcode, com y/z já resolvidos
+    namespace = {}
+    handlers = []
+    for op in range(256):
+        name = f"op_{op:02X}"
+        handlers.append(_compile(f"def {name}(regs, operand):\n    {op_body(op)}", name, namespace))
+    return handlers
+
+
+def build_dict():
+    handlers = dict(enumerate(_handlers()))
+
+    def run(ops, operands, regs):
+        table = handlers
+        for opcode, operand in zip(ops, operands):
+            table[opcode](regs, operand)
+    return run
+
+
+def build_table():
+    handlers = _handlers()
+
+    def run(ops, operands, regs):
+        table = handlers
+        for opcode, operand in zip(ops, operands):
+            table[opcode](regs, operand)
+    return run
+
+
+def split_blocks(stream):
+    # Blocos básicos do stream: terminam num desvio ou quando o PC não segue em sequência
+    # (interrupção). Devolve [(início, fim)] em índices de instrução.
+    count = len(stream) // 4
+    blocks = []
+    start = 0
+    for i in range(count):
+        op = stream[i * 4]
+        if i + 1 < count:
+            pc = stream[i * 4 + 2] | (stream[i * 4 + 3] << 8)
+            next_pc = stream[i * 4 + 6] | (stream[i * 4 + 7] << 8)
+            if op not in BLOCK_END and 0 < next_pc - pc <= 3:
+                continue
+        blocks.append((start, i + 1))
+        start = i + 1
+    return blocks
+
+
+def build_straight_line(stream):
+    # Compilação de blocos: cada bloco básico vira uma função sem dispatch nenhum
+    # (operandos viram constantes). Limite superior de um block compiler.
+    # Blocos iguais (mesmo PC e mesmos bytes) são compilados uma vez só.
+    compiled = {}
+    sequence = []
+    for start, end in split_blocks(stream):
+        key = stream[start * 4 : end * 4]
+        block = compiled.get(key)
+        if block is None:
+            name = f"block_{len(compiled)}"
+            body = [op_body(stream[i * 4], str(stream[i * 4 + 1])) for i in range(start, end)]
+            block = _compile(f"def {name}(regs):\n    " + "\n    ".join(body), name)
+            compiled[key] = block
+        sequence.append(block)
+
+    def run(ops, operands, regs):
+        for block in sequence:
+            block(regs)
+    return run, len(compiled)
+
+
+def run_strategies(stream, repeat=5, progress=None):
+    ops = stream[0::4]
+    operands = stream[1::4]
+    count = len(ops)
+
+    straight_line, unique_blocks = build_straight_line(stream)
+    strategies = [
+        ("baseline", build_baseline()),
+        ("if-chain", build_if_chain()),
+        ("match", build_match()),
+        ("dict", build_dict()),
+        ("table", build_table()),
+        ("straight-line", straight_line),
+    ]
+
+    results = []
+    reference = None
+    for name, run in strategies:
+        if run is None:
+            continue
+        best = None
+        for _ in range(repeat):
+            regs = bytearray(8)
+            start = time.perf_counter()
+            run(ops, operands, regs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        # Todas as estratégias têm que chegar nos mesmos registradores
+        if name != "baseline":
+            if reference is None:
+                reference = regs
+            elif regs != reference:
+                raise AssertionError(f"{name} divergiu: {regs.hex()} != {reference.hex()}")
+
+        result = {"strategy": name, "ns_per_instr": best / count * 1e9}
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    baseline = results[0]["ns_per_instr"]
+    for r in results:
+        r["net_ns_per_instr"] = r["ns_per_instr"] - baseline
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "instructions": count,
+        "unique_blocks": unique_blocks,
+        "results": results,
+    }
+
+
+def opcode_histogram(stream, top=10):
+    counts = [0] * 256
+    for op in stream[0::4]:
+        counts[op] += 1
+    total = sum(counts) or 1
+    ranked = sorted(range(256), key=lambda op: -counts[op])[:top]
+    return [(op, counts[op] / total) for op in ranked]
+
+
+def format_report(report):
+    lines = [f"{report['implementation']} {report['python']} | {report['instructions']} instruções | "
+             f"{report['unique_blocks']} blocos únicos",
+             f"{'ESTRATÉGIA':<14} {'NS/INSTR':>9} {'LÍQUIDO':>9}"]
+    for r in report["results"]:
+        lines.append(f"{r['strategy']:<14} {r['ns_per_instr']:>9.1f} {r['net_ns_per_instr']:>9.1f}")
+    return "\n".join(lines)
+
+
+def dump_json(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,265 @@
+import threading
+import time
+import pygame
+
+# Paleta DMG (índices 0-3 do framebuffer)
+PALETTE = [
+    (224, 248, 208), # 0: Branco
+    (136, 192, 112), # 1: Cinza Claro
+    (52, 104, 86),   # 2: Cinza Escuro
+    (8, 24, 32)      # 3: Preto
+]
+
+# Estado do joypad (snapshot de input): 1 bit por botão, 1 = pressionado
+# Nibble baixo = botões (seleção P15), nibble alto = direcional (seleção P14)
+BUTTONS = {
+    "a": 0x01, "b": 0x02, "select": 0x04, "start": 0x08,
+    "right": 0x10, "left": 0x20, "up": 0x40, "down": 0x80,
+}
+
+JOYPAD_KEYS = [
+    (pygame.K_x, BUTTONS["a"]),
+    (pygame.K_z, BUTTONS["b"]),
+    (pygame.K_BACKSPACE, BUTTONS["select"]),
+    (pygame.K_RETURN, BUTTONS["start"]),
+    (pygame.K_RIGHT, BUTTONS["right"]),
+    (pygame.K_LEFT, BUTTONS["left"]),
+    (pygame.K_UP, BUTTONS["up"]),
+    (pygame.K_DOWN, BUTTONS["down"]),
+]
+
+# Segurar para acelerar (fast-forward)
+FAST_FORWARD_KEY = pygame.K_TAB
+# Segurar para voltar no tempo (com o rewind ligado)
+REWIND_KEY = pygame.K_r
+
+
+class PygameDisplay:
+    # Janela do Pygame: escala, flip, eventos e leitura do teclado.
+    # Todas as chamadas precisam vir da MESMA thread que criou a janela.
+    __slots__ = ['framebuffer', 'scale', 'caption', 'window', 'gb_surface', 'scaled_surface',
+                 'pixel_filter', 'joypad', 'fast_forward', 'rewind', 'quit_requested', 'flip_time']
+
+    def __init__(self, framebuffer, scale=3, caption="GB-Py | Tetris a Alta Velocidade", scale_filter=None):
+        pygame.init()
+        self.framebuffer = framebuffer
+        self.caption = caption
+
+        # A superfície é criada EM CIMA do bytearray (frombuffer),
+        # então o que for escrito no framebuffer já está na superfície.
+        self.gb_surface = pygame.image.frombuffer(framebuffer, (160, 144), "P")
+        self.gb_surface.set_palette(PALETTE)
+
+        if scale_filter:
+            # Filtro NumPy (nearest, scale2x, scale3x, scale4x) escolhido na inicialização.
+            # O filtro escreve num array pré-alocado e a superfície escalada é uma view dele.
+            from filters import PixelFilter # NumPy só é necessário quando há filtro
+            self.pixel_filter = PixelFilter(scale_filter, framebuffer, scale)
+            scale = self.pixel_filter.scale
+            self.scaled_surface = pygame.image.frombuffer(self.pixel_filter.output, (160 * scale, 144 * scale), "P")
+        else:
+            # Superfície escalada pré-alocada (mesmo formato 8-bit + paleta),
+            # reaproveitada todo frame pelo transform.scale
+            self.pixel_filter = None
+            self.scaled_surface = pygame.Surface((160 * scale, 144 * scale), depth=8)
+        self.scaled_surface.set_palette(PALETTE)
+
+        self.scale = scale
+        self.window = pygame.display.set_mode((160 * scale, 144 * scale))
+        pygame.display.set_caption(caption)
+
+        self.joypad = 0
+        self.fast_forward = False
+        self.rewind = False
+        self.quit_requested = False
+        self.flip_time = 0.0 # Duração do último flip (s)
+
+    def present(self, lcd_on):
+        if lcd_on:
+            # Escala para a superfície pré-alocada (sem criar nada novo) e joga na janela
+            if self.pixel_filter:
+                self.pixel_filter.apply()
+            else:
+                pygame.transform.scale(self.gb_surface, (160 * self.scale, 144 * self.scale), self.scaled_surface)
+            self.window.blit(self.scaled_surface, (0, 0))
+        else:
+            # Tela branca se LCD desligado
+            self.window.fill(PALETTE[0])
+
+        start = time.perf_counter()
+        pygame.display.flip()
+        self.flip_time = time.perf_counter() - start
+
+    def poll(self):
+        # Processa eventos e tira um snapshot do joypad
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.quit_requested = True
+            elif event.type == pygame.WINDOWEXPOSED:
+                # Frames idênticos não são reenviados: se a janela foi coberta/restaurada,
+                # a superfície da janela ainda tem o último frame, basta mostrar de novo
+                pygame.display.flip()
+
+        keys = pygame.key.get_pressed()
+        pressed = 0
+        for key, bit in JOYPAD_KEYS:
+            if keys[key]: pressed |= bit
+        self.joypad = pressed
+        self.fast_forward = bool(keys[FAST_FORWARD_KEY])
+        self.rewind = bool(keys[REWIND_KEY])
+
+    def set_status(self, text):
+        # Ex: velocidade atingida, mostrada no título da janela
+        pygame.display.set_caption(f"{self.caption} | {text}")
+
+    def close(self):
+        pygame.quit()
+
+
+class HeadlessPresenter:
+    # Sem janela: testes, benchmarks e execuções em lote
+    __slots__ = ['joypad', 'fast_forward', 'rewind', 'quit_requested', 'flip_time']
+
+    def __init__(self):
+        self.joypad = 0
+        self.fast_forward = False
+        self.rewind = False
+        self.quit_requested = False
+        self.flip_time = 0.0
+
+    def submit(self, framebuffer, lcd_on):
+        pass
+
+    def poll(self):
+        pass
+
+    def set_status(self, text):
+        pass
+
+    def close(self):
+        pass
+
+
+class InlinePresenter:
+    # Modo padrão: apresenta o frame na própria thread da emulação.
+    # Display stall / vsync bloqueiam a CPU emulada junto.
+    __slots__ = ['display']
+
+    def __init__(self, framebuffer, scale=3, scale_filter=None):
+        self.display = PygameDisplay(framebuffer, scale, scale_filter=scale_filter)
+
+    def submit(self, framebuffer, lcd_on):
+        self.display.present(lcd_on) # Zero-copy: a superfície já aponta pro framebuffer
+
+    def poll(self):
+        self.display.poll()
+
+    @property
+    def joypad(self):
+        return self.display.joypad
+
+    @property
+    def fast_forward(self):
+        return self.display.fast_forward
+
+    @property
+    def rewind(self):
+        return self.display.rewind
+
+    @property
+    def quit_requested(self):
+        return self.display.quit_requested
+
+    @property
+    def flip_time(self):
+        return self.display.flip_time
+
+    def set_status(self, text):
+        self.display.set_status(text)
+
+    def close(self):
+        self.display.close()
+
+
+class ThreadedPresenter:
+    # Modo desacoplado: a emulação entrega frames prontos para uma thread de apresentação
+    # e NUNCA espera por ela (triple buffer: framebuffer da PPU -> pending -> front).
+    # Se a tela for lenta, frames intermediários são descartados (dropped_frames).
+    # O input volta no sentido contrário como um snapshot (int) lido sem lock.
+    # Nota: SDL exige a janela na thread principal no macOS; lá use o InlinePresenter.
+    __slots__ = ['scale', 'scale_filter', 'pending', 'pending_lcd', 'has_new', 'lock', 'frame_ready',
+                 'thread', 'running', 'joypad', 'fast_forward', 'rewind', 'quit_requested', 'status',
+                 'presented_frames', 'dropped_frames', 'flip_time']
+
+    def __init__(self, framebuffer, scale=3, scale_filter=None):
+        self.scale = scale
+        self.scale_filter = scale_filter
+        self.pending = bytearray(len(framebuffer)) # Último frame completo entregue pela emulação
+        self.pending_lcd = True
+        self.has_new = False
+        self.lock = threading.Lock()
+        self.frame_ready = threading.Event()
+
+        self.joypad = 0
+        self.fast_forward = False
+        self.rewind = False
+        self.quit_requested = False
+        self.status = None
+        self.presented_frames = 0
+        self.dropped_frames = 0
+        self.flip_time = 0.0 # O flip acontece na outra thread: não pesa no frame da emulação
+
+        self.running = True
+        self.thread = threading.Thread(target=self._present_loop, name="gbpy-presenter", daemon=True)
+        self.thread.start()
+
+    def submit(self, framebuffer, lcd_on):
+        # Chamado pela emulação no fim do frame: só uma cópia de 23 KB sob o lock
+        with self.lock:
+            self.pending[:] = framebuffer
+            self.pending_lcd = lcd_on
+            if self.has_new:
+                self.dropped_frames += 1 # O presenter não chegou a mostrar o anterior
+            self.has_new = True
+        self.frame_ready.set()
+
+    def poll(self):
+        pass # Eventos e teclado são lidos pela thread de apresentação
+
+    def set_status(self, text):
+        self.status = text # Aplicado pela thread de apresentação
+
+    def _present_loop(self):
+        front = bytearray(len(self.pending)) # Buffer que a janela está mostrando
+        display = PygameDisplay(front, self.scale, scale_filter=self.scale_filter)
+        status = None
+
+        while self.running:
+            # Continua bombeando eventos mesmo sem frames novos (janela não congela)
+            if self.frame_ready.wait(0.05):
+                self.frame_ready.clear()
+
+                with self.lock:
+                    front[:] = self.pending
+                    lcd_on = self.pending_lcd
+                    self.has_new = False
+
+                display.present(lcd_on)
+                self.presented_frames += 1
+
+            display.poll()
+            self.joypad = display.joypad
+            self.fast_forward = display.fast_forward
+            self.rewind = display.rewind
+            if self.status != status:
+                status = self.status
+                display.set_status(status)
+            if display.quit_requested:
+                self.quit_requested = True
+
+        display.close()
+
+    def close(self):
+        self.running = False
+        self.frame_ready.set()
+        self.thread.join()
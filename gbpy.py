@@ -0,0 +1,572 @@
+import argparse
+import sys
+import time
+
+# Ponto de entrada de linha de comando:
+#   python gbpy.py run roms/Tetris.gb [--speed 2] [--frameskip auto] [--filter scale2x] [--stats] [--no-gc]
+#                      [--load-state tetris.state] [--save-state tetris.state]
+#                      [--rewind] [--rewind-mb 64] [--rewind-interval 1]   (segure R para voltar)
+#                      [--audio | --audio-sync | --wav tetris.wav | --raw tetris.pcm] [--headless --frames 600]
+#                      [--record bug.gbm]   (grava o input e os hashes de estado em bug.gbh;
+#                                            com --load-state o estado vai junto)
+#   python gbpy.py play roms/Tetris.gb bug.gbm [--watch] [--write-hashes]   (headless e sem limite de velocidade)
+#   python gbpy.py verify roms/Tetris.gb bug.gbm [--hashes bug.gbh]   (primeiro frame divergente)
+#   python gbpy.py test [-j 8] [--filter cpu_instrs] [--frames 600] [--timeout 60] [--record-screens]
+#   python gbpy.py test --acid2-reference reference-dmg.png   (hash de referência da imagem oficial)
+#   python gbpy.py bench [tetris pokemon ...] [--frames 300] [--repeat 3] [--save] [--json resultado.json]
+#                        (--save repete 3x por padrão: a base do compare precisa de >= 2 amostras)
+#   python gbpy.py compare [--base abc123] [--repeat 5]     (roda agora e compara com o histórico)
+#   python gbpy.py history
+#   python gbpy.py fork pokemon --at 480 [--branches 64] [--frames 120] [--button a] [-j 8]
+#                                        (ramo i aperta o botão i frames depois do fork)
+#   python gbpy.py alloc pokemon [--frames 120] [--warmup 60] [--max-blocks 0.5] [--threshold 1024]
+#                                (falha se o loop acumula objetos)
+#   python gbpy.py profile-ops pokemon [--frames 300] [--rate 16] [--csv ops.csv]
+#   python gbpy.py profile-frames zelda [--frames 300]
+#   python gbpy.py profile-guest pokemon [--frames 600] [--interval 64] [--sym pokeblue.sym] [--csv hot.csv]
+#   python gbpy.py profile-calls zelda [--frames 600] [-o zelda.folded]   (flamegraph.pl zelda.folded > zelda.svg)
+#   python gbpy.py dispatch record tetris -o tetris.opstream [--frames 120]
+#   python3.12 gbpy.py dispatch run tetris.opstream [--json dispatch-3.12.json]
+
+
+def cmd_run(args):
+    import savestate
+    from CPU import GameBoy
+
+    if args.record and args.rewind:
+        print("--record e --rewind não podem ser usados juntos (o rewind volta o estado no meio da gravação)")
+        return 2
+    gb = GameBoy()
+    gb.load_rom(args.rom)
+    if args.load_state:
+        savestate.load_state_file(gb, args.load_state)
+    speed = None if args.speed == 0 else args.speed
+    frameskip = args.frameskip if args.frameskip == "auto" else int(args.frameskip)
+    audio = None
+    if args.audio:
+        from apu import MixerSink
+        audio = MixerSink()
+    elif args.audio_sync:
+        # Dispositivo de baixa latência; a emulação anda no ritmo em que o áudio consome
+        from apu import DeviceSink
+        audio = DeviceSink()
+        speed = "audio"
+    elif args.wav:
+        from apu import WaveSink
+        audio = WaveSink(args.wav)
+    elif args.raw:
+        from apu import RawSink
+        audio = RawSink(args.raw)
+    recording = input_source = hasher = None
+    if args.record:
+        import movie
+        import statehash
+        recording, input_source = movie.begin_recording(gb, apu=audio is not None)
+        hasher = statehash.StateHasher()
+        hasher.reset(gb)
+    rewind = None
+    if args.rewind:
+        from rewind import RewindBuffer
+        rewind = RewindBuffer(args.rewind_interval, args.rewind_mb)
+    options = {
+        "threaded_present": args.threaded,
+        "frameskip": frameskip,
+        "speed": speed,
+        "scale_filter": args.filter,
+        "audio": audio,
+        "headless": args.headless,
+        "max_frames": args.frames,
+        "show_stats": args.stats,
+        "disable_gc": args.no_gc,
+        "rewind": rewind,
+        "input_source": input_source,
+        "on_frame": hasher.update if hasher is not None else None,
+    }
+    gb.run(**options)
+    if gb.frame_timers is not None:
+        print(gb.frame_timers.format_table())
+    if rewind is not None:
+        print(rewind.format_stats())
+    if args.wav or args.raw:
+        print(f"Áudio gravado em {args.wav or args.raw}")
+    if args.save_state:
+        savestate.save_state_file(gb, args.save_state)
+        print(f"Estado gravado em {args.save_state}")
+    if recording is not None:
+        movie.finish_recording(gb, recording)
+        movie.save_movie(recording, args.record)
+        statehash.save_hashes(hasher, statehash.hash_path_for(args.record))
+        print(f"Movie gravado em {args.record}: {recording.frames()} frames, {len(recording.events)} mudanças de input "
+              f"(hashes em {statehash.hash_path_for(args.record)})")
+    return 0
+
+
+def cmd_play(args):
+    import contextlib
+    import hashlib
+    import os
+    import movie
+    from CPU import GameBoy
+    from pacing import DMG_FPS
+
+    recording = movie.load_movie(args.movie)
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(args.rom)
+    start = time.perf_counter()
+    if args.write_hashes:
+        import statehash
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            hasher = statehash.record_hashes(gb, recording, headless=True, speed=None)
+        statehash.save_hashes(hasher, statehash.hash_path_for(args.movie))
+        print(f"Hashes de estado gravados em {statehash.hash_path_for(args.movie)}")
+    elif args.watch:
+        movie.play(gb, recording)
+    else:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            movie.play(gb, recording, headless=True, speed=None)
+    elapsed = time.perf_counter() - start
+    frames = gb.frame_count - recording.start_frame
+    origin = "save state" if recording.start_state is not None else "power-on"
+    print(f"{frames} de {recording.frames()} frames a partir do {origin} em {elapsed:.2f} s "
+          f"({frames / elapsed:.1f} fps, {frames / elapsed / DMG_FPS:.1f}x tempo real)")
+    print(f"Tela final: {hashlib.sha1(gb.framebuffer).hexdigest()[:16]}")
+    return 0
+
+
+def cmd_test(args):
+    import conformance
+
+    if args.acid2_reference:
+        hashes = conformance.load_screen_hashes()
+        hashes[conformance.ACID2_ROM] = conformance.reference_hash_from_image(args.acid2_reference)
+        conformance.save_screen_hashes(hashes)
+        print(f"Referência do dmg-acid2 ({hashes[conformance.ACID2_ROM]}) gravada em {conformance.SCREEN_HASHES_FILE}")
+        return 0
+
+    roms = conformance.find_roms(name_filter=args.filter)
+    if not roms:
+        print("Nenhuma ROM de teste encontrada.")
+        return 1
+    if args.frames:
+        roms = [(path, args.frames, mode) for path, _, mode in roms]
+
+    print(f"Rodando {len(roms)} ROMs de teste...")
+    start = time.perf_counter()
+
+    def progress(result):
+        print(f"  {result['status']:<7} {result['rom']} ({result['wall']:.1f}s)", flush=True)
+
+    timeout = args.timeout if args.timeout is not None else conformance.DEFAULT_TIMEOUT
+    results = conformance.run_suite(roms, jobs=args.jobs, progress=progress, timeout=timeout)
+    print()
+    print(conformance.format_table(results))
+    print(f"Tempo total: {time.perf_counter() - start:.1f}s")
+
+    if args.verbose:
+        for r in results:
+            if r["status"] != "PASS" and r["serial"]:
+                print(f"\n--- {r['rom']} (serial) ---\n{r['serial']}")
+
+    if args.record_screens:
+        # Grava o hash atual das ROMs de tela como referência (confira a tela antes!)
+        hashes = conformance.load_screen_hashes()
+        for (path, _, mode), r in zip(roms, results):
+            if mode == "screen":
+                hashes[r["rom"]] = r["screen_hash"]
+        conformance.save_screen_hashes(hashes)
+        print(f"Hashes de tela gravados em {conformance.SCREEN_HASHES_FILE}")
+
+    return 0 if all(r["status"] == "PASS" for r in results) else 1
+
+
+def cmd_bench(args):
+    import json
+    import bench
+
+    names = args.workloads or list(bench.WORKLOADS)
+    unknown = [n for n in names if n not in bench.WORKLOADS]
+    if unknown:
+        print(f"Workload desconhecido: {', '.join(unknown)} (opções: {', '.join(bench.WORKLOADS)})")
+        return 1
+
+    def progress(result):
+        print(f"  {result['workload']}: {result['fps']:.1f} fps ({result['wall']:.1f}s)", flush=True)
+
+    repeat = args.repeat or (bench.SAVE_REPEAT if args.save else 1)
+    if args.save and repeat < bench.MIN_SAMPLES:
+        print(f"AVISO: com --repeat {repeat} esta execução não serve de base para o compare "
+              f"(são precisas pelo menos {bench.MIN_SAMPLES} amostras por workload)")
+    report = bench.run_suite(names, frames=args.frames, repeat=repeat, progress=progress)
+    print()
+    print(bench.format_table(bench.summarize(report["results"])))
+
+    if args.save:
+        bench.save_history(report)
+        print(f"Execução adicionada ao histórico ({bench.HISTORY_FILE})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Resultados gravados em {args.json}")
+    return 0
+
+
+def cmd_compare(args):
+    import bench
+
+    history = bench.load_history()
+    if args.new:
+        # Só compara duas entradas que já estão no histórico
+        new = bench.find_entry(history, args.new)
+        if new is None:
+            print(f"Commit {args.new} não está no histórico.")
+            return 1
+    else:
+        names = args.workloads or list(bench.WORKLOADS)
+
+        def progress(result):
+            print(f"  {result['workload']}: {result['fps']:.1f} fps ({result['wall']:.1f}s)", flush=True)
+
+        new = bench.run_suite(names, frames=args.frames, repeat=args.repeat, progress=progress)
+        bench.save_history(new)
+        print()
+
+    base = bench.find_baseline(history, new["env"], args.base)
+    if base is None:
+        print("Nenhuma execução de base no histórico para esta máquina e versão do Python "
+              "(rode 'gbpy bench --save' num commit anterior).")
+        return 1
+
+    rows = bench.compare(base, new, threshold=args.threshold)
+    print(bench.format_compare(rows, base["env"], new["env"]))
+    if any(r["verdict"] == "POUCAS AMOSTRAS" for r in rows):
+        print(f"\nERRO: a base ou a execução nova tem menos de {bench.MIN_SAMPLES} amostras por workload, "
+              "então não há como testar se a diferença é significativa.\n"
+              f"Regrave a base com 'gbpy bench --save' (repete {bench.SAVE_REPEAT}x) ou use --repeat >= {bench.MIN_SAMPLES}.")
+        return 1
+    regressions = [r for r in rows if r["verdict"] == "REGRESSÃO"]
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) significativa(s).")
+        return 1
+    return 0
+
+
+def cmd_history(args):
+    import bench
+
+    for entry in bench.load_history():
+        env = entry["env"]
+        summary = bench.summarize(entry["results"])
+        fps = ", ".join(f"{r['workload']} {r['fps']:.1f}" for r in summary)
+        print(f"{env['date']}  {env['commit'] or '?':<14} py{env['python']:<8} {env['machine']:<12} "
+              f"x{entry.get('repeat', 1)}  fps: {fps}")
+    return 0
+
+
+def resolve_rom(name):
+    # Aceita o nome de um workload do benchmark (usa a ROM e o input dele) ou um caminho de ROM
+    import os
+    import bench
+
+    if name in bench.WORKLOADS:
+        rom, _, input_script = bench.WORKLOADS[name]
+        return os.path.join(bench.ROMS_DIR, rom), input_script
+    return name, None
+
+
+def run_headless(rom, frames, input_script=None, **options):
+    import contextlib
+    import os
+    from CPU import GameBoy
+
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(rom)
+        gb.run(headless=True, speed=None, max_frames=frames, input_script=input_script, **options)
+    return gb
+
+
+def cmd_fork(args):
+    import zlib
+    import bench
+
+    rom, input_script = resolve_rom(args.rom)
+    gb = run_headless(rom, args.at, input_script)
+    inputs = lambda i: bench.press(i, args.button)
+    start = time.perf_counter()
+    results = gb.fork_many(args.branches, inputs, args.frames, jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+
+    # Agrupa os ramos pelo resultado (tela + RAM)
+    outcomes = {}
+    for r in results:
+        if r["error"]:
+            print(f"ramo {r['index']}: {r['error']}")
+            continue
+        key = (r["screen_hash"], zlib.crc32(b"".join(r["regions"])))
+        outcomes.setdefault(key, []).append(r["index"])
+    print(f"{len(results)} ramos de {args.frames} frames a partir do frame {gb.frame_count} "
+          f"em {elapsed:.2f} s ({len(results) / elapsed * 60:.0f} ramos/min)")
+    print(f"{len(outcomes)} resultados distintos:")
+    for (screen, ram), branches in sorted(outcomes.items(), key=lambda item: item[1][0]):
+        print(f"  tela {screen}  RAM {ram:08x}  ramos {branches}")
+    return 0
+
+
+def cmd_verify(args):
+    import contextlib
+    import os
+    import movie
+    import statehash
+    from CPU import GameBoy
+
+    recording = movie.load_movie(args.movie)
+    hashes = args.hashes or statehash.hash_path_for(args.movie)
+    expected = statehash.load_hashes(hashes)
+    gb = GameBoy()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        gb.load_rom(args.rom)
+        divergence = statehash.verify(gb, recording, expected, headless=True, speed=None)
+    if divergence is None:
+        print(f"OK: {expected.frames()} frames idênticos a {hashes}")
+        return 0
+    frame, core, memory = divergence
+    parts = " e ".join(name for name, differs in (("núcleo (CPU/MBC/PPU/timer)", core), ("memória", memory)) if differs)
+    print(f"DIVERGE no frame {frame} ({frame - expected.start_frame} do movie): {parts}")
+    return 1
+
+
+def cmd_alloc(args):
+    import bench
+
+    rom, input_script = resolve_rom(args.rom)
+    result = bench.allocation_profile(rom, args.frames, args.warmup, input_script, disable_gc=args.no_gc)
+    print(bench.format_allocations(result, args.threshold, args.max_blocks))
+    return 0 if bench.allocations_ok(result, args.threshold, args.max_blocks) else 1
+
+
+def cmd_profile_ops(args):
+    from profiler import OpcodeProfiler
+
+    rom, input_script = resolve_rom(args.rom)
+    profiler = OpcodeProfiler(args.rate)
+    run_headless(rom, args.frames, input_script, profiler=profiler)
+    print(profiler.format_table(args.top))
+    if args.csv:
+        profiler.write_csv(args.csv)
+        print(f"CSV gravado em {args.csv}")
+    return 0
+
+
+def cmd_profile_frames(args):
+    from profiler import FrameTimers
+
+    rom, input_script = resolve_rom(args.rom)
+    timers = FrameTimers(window=args.frames, sample_rate=args.rate)
+    run_headless(rom, args.frames, input_script, frame_timers=timers)
+    print(timers.format_table())
+    return 0
+
+
+def cmd_profile_guest(args):
+    from profiler import GuestProfiler, load_sym, sym_path_for
+
+    rom, input_script = resolve_rom(args.rom)
+    sym = args.sym or sym_path_for(rom)
+    profiler = GuestProfiler(args.interval, load_sym(sym) if sym else None)
+    run_headless(rom, args.frames, input_script, guest_profiler=profiler)
+    if sym:
+        print(f"Rótulos de {sym}")
+    print(profiler.format_table(args.top))
+    if args.csv:
+        profiler.write_csv(args.csv)
+        print(f"CSV gravado em {args.csv}")
+    return 0
+
+
+def cmd_profile_calls(args):
+    from profiler import CallStackTracker, load_sym, sym_path_for
+
+    rom, input_script = resolve_rom(args.rom)
+    sym = args.sym or sym_path_for(rom)
+    tracker = CallStackTracker(load_sym(sym) if sym else None)
+    run_headless(rom, args.frames, input_script, call_tracker=tracker)
+    print(tracker.format_table(args.top))
+    if args.output:
+        tracker.write_collapsed(args.output)
+        print(f"Pilhas (formato collapsed) gravadas em {args.output}")
+    return 0
+
+
+def cmd_dispatch_record(args):
+    import dispatch_bench
+
+    rom, input_script = resolve_rom(args.rom)
+    stream = dispatch_bench.record(rom, args.frames, input_script)
+    dispatch_bench.save_stream(args.output, stream)
+    print(f"{len(stream) // 4} instruções gravadas em {args.output}")
+    print("Opcodes mais frequentes: " + ", ".join(
+        f"{op:02X} ({share:.1%})" for op, share in dispatch_bench.opcode_histogram(stream)))
+    return 0
+
+
+def cmd_dispatch_run(args):
+    import dispatch_bench
+
+    stream = dispatch_bench.load_stream(args.stream)
+
+    def progress(result):
+        print(f"  {result['strategy']}: {result['ns_per_instr']:.1f} ns/instr", flush=True)
+
+    report = dispatch_bench.run_strategies(stream, repeat=args.repeat, progress=progress)
+    print()
+    print(dispatch_bench.format_report(report))
+    if args.json:
+        dispatch_bench.dump_json(args.json, report)
+        print(f"Resultados gravados em {args.json}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="gbpy", description="GB-Py: emulador de Game Boy (DMG)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Roda uma ROM na janela")
+    p.add_argument("rom")
+    p.add_argument("--speed", type=float, default=1.0, help="Multiplicador de velocidade (0 = sem limite)")
+    p.add_argument("--frameskip", default="0", help="N ou 'auto'")
+    p.add_argument("--filter", default=None, help="nearest, scale2x, scale3x, scale4x (até ~0.7 ms por frame no scale4x)")
+    p.add_argument("--threaded", action="store_true", help="Apresenta os frames numa thread separada")
+    p.add_argument("--stats", action="store_true", help="Tempo por subsistema no título da janela")
+    p.add_argument("--no-gc", action="store_true", help="gc.freeze() e GC cíclico desligado durante a emulação")
+    sound = p.add_mutually_exclusive_group()
+    sound.add_argument("--audio", action="store_true", help="Toca o som (pygame.mixer)")
+    sound.add_argument("--audio-sync", action="store_true",
+                       help="Toca o som com buffer de baixa latência e usa o áudio como relógio (ignora --speed)")
+    sound.add_argument("--wav", default=None, help="Grava o som neste .wav (estéreo 16-bit, 44.1 kHz)")
+    sound.add_argument("--raw", default=None, help="Grava o som como PCM cru (int16 estéreo intercalado)")
+    p.add_argument("--headless", action="store_true", help="Sem janela (ex: gravar o som com --wav/--raw)")
+    p.add_argument("--frames", type=int, default=None, help="Para depois de N frames")
+    p.add_argument("--load-state", default=None, help="Começa deste save state (da mesma ROM)")
+    p.add_argument("--save-state", default=None, help="Grava o estado neste arquivo ao fechar")
+    p.add_argument("--rewind", action="store_true", help="Liga o rewind (segure R para voltar)")
+    p.add_argument("--rewind-mb", type=float, default=64, help="Memória máxima do rewind")
+    p.add_argument("--rewind-interval", type=int, default=1, help="Captura 1 estado a cada N frames")
+    p.add_argument("--record", default=None, help="Grava o input da sessão neste movie")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("play", help="Reproduz um movie (headless e sem limite de velocidade)")
+    p.add_argument("rom")
+    p.add_argument("movie")
+    p.add_argument("--watch", action="store_true", help="Reproduz na janela, em tempo real")
+    p.add_argument("--write-hashes", action="store_true", help="Grava os hashes de estado por frame ao lado do movie")
+    p.set_defaults(func=cmd_play)
+
+    p = sub.add_parser("verify", help="Reproduz um movie e compara o hash de estado de cada frame")
+    p.add_argument("rom")
+    p.add_argument("movie")
+    p.add_argument("--hashes", default=None, help="Stream de referência (padrão: o .gbh ao lado do movie)")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("test", help="Roda as ROMs de conformidade (blargg, dmg-acid2) em paralelo")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Processos (padrão: todos os núcleos)")
+    p.add_argument("--filter", default=None, help="Só ROMs cujo nome contém este texto")
+    p.add_argument("--frames", type=int, default=None, help="Limite de frames por ROM (sobrescreve o padrão)")
+    p.add_argument("--timeout", type=int, default=None, help="Limite de tempo real por ROM, em segundos")
+    p.add_argument("--record-screens", action="store_true",
+                   help="Grava os hashes de tela desta execução como referência (confira a tela antes)")
+    p.add_argument("--acid2-reference", default=None,
+                   help="Grava a referência do dmg-acid2 a partir da imagem oficial (img/reference-dmg.png)")
+    p.add_argument("-v", "--verbose", action="store_true", help="Mostra a saída serial das ROMs que falharam")
+    p.set_defaults(func=cmd_test)
+
+    p = sub.add_parser("bench", help="Benchmark de ponta a ponta com workloads determinísticos")
+    p.add_argument("workloads", nargs="*", help="Workloads (padrão: todos)")
+    p.add_argument("--frames", type=int, default=None, help="Frames por workload (sobrescreve o padrão)")
+    p.add_argument("--repeat", type=int, default=None, help="Repetições de cada workload (padrão: 1, ou 3 com --save)")
+    p.add_argument("--save", action="store_true", help="Adiciona a execução ao histórico local")
+    p.add_argument("--json", default=None, help="Grava os resultados neste arquivo JSON")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("compare", help="Roda a suíte e compara com o histórico (intervalos de confiança)")
+    p.add_argument("workloads", nargs="*", help="Workloads (padrão: todos)")
+    p.add_argument("--base", default=None, help="Commit de base (padrão: último commit diferente no histórico)")
+    p.add_argument("--new", default=None, help="Compara com este commit do histórico em vez de rodar agora")
+    p.add_argument("--repeat", type=int, default=5, help="Repetições de cada workload")
+    p.add_argument("--frames", type=int, default=None, help="Frames por workload (sobrescreve o padrão)")
+    p.add_argument("--threshold", type=float, default=0.02, help="Mudança mínima para contar como regressão")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("history", help="Lista o histórico de benchmarks")
+    p.set_defaults(func=cmd_history)
+
+    p = sub.add_parser("fork", help="Ramifica um estado em vários futuros (os.fork) e agrupa os resultados")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--at", type=int, default=300, help="Frame do fork (roda até ele com o input do workload)")
+    p.add_argument("--branches", type=int, default=64)
+    p.add_argument("--frames", type=int, default=120, help="Frames que cada ramo roda")
+    p.add_argument("--button", default="a", help="Botão que o ramo i aperta no frame i")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Ramos simultâneos (padrão: núcleos)")
+    p.set_defaults(func=cmd_fork)
+
+    p = sub.add_parser("alloc", help="Blocos e bytes que o loop retém por frame; falha se acumula objetos")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--frames", type=int, default=120, help="Frames medidos")
+    p.add_argument("--warmup", type=int, default=60, help="Frames antes da medição (caches enchendo)")
+    p.add_argument("--max-blocks", type=float, default=0.5, help="Blocos retidos por frame aceitos (média)")
+    p.add_argument("--threshold", type=int, default=1024, help="Bytes retidos por frame aceitos (média)")
+    p.add_argument("--no-gc", action="store_true", help="Mede com gc.freeze() e o GC cíclico desligado")
+    p.set_defaults(func=cmd_alloc)
+
+    p = sub.add_parser("profile-ops", help="Custo no host de cada opcode (execuções e tempo amostrado)")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--rate", type=int, default=16, help="Mede o tempo de 1 a cada N iterações")
+    p.add_argument("--top", type=int, default=40, help="Linhas da tabela")
+    p.add_argument("--csv", default=None, help="Grava a tabela completa neste CSV")
+    p.set_defaults(func=cmd_profile_ops)
+
+    p = sub.add_parser("profile-frames", help="Tempo de cada subsistema por frame (média, p50/p95/p99)")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--rate", type=int, default=32, help="Mede 1 a cada N iterações do loop")
+    p.set_defaults(func=cmd_profile_frames)
+
+    p = sub.add_parser("profile-guest", help="Rotinas do jogo onde o PC emulado passa mais tempo (banco:endereço)")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--interval", type=int, default=64, help="Amostra o PC a cada N ciclos")
+    p.add_argument("--sym", default=None, help="Arquivo .sym do RGBDS (padrão: o .sym ao lado da ROM)")
+    p.add_argument("--top", type=int, default=30, help="Linhas da tabela")
+    p.add_argument("--csv", default=None, help="Grava todas as faixas neste CSV")
+    p.set_defaults(func=cmd_profile_guest)
+
+    p = sub.add_parser("profile-calls", help="Ciclos emulados por caminho de chamadas (pilhas para flamegraph)")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--sym", default=None, help="Arquivo .sym do RGBDS (padrão: o .sym ao lado da ROM)")
+    p.add_argument("--top", type=int, default=30, help="Linhas da tabela")
+    p.add_argument("-o", "--output", default=None, help="Grava as pilhas no formato collapsed (flamegraph.pl, speedscope)")
+    p.set_defaults(func=cmd_profile_calls)
+
+    p = sub.add_parser("dispatch", help="Benchmark de estratégias de dispatch com um stream real de opcodes")
+    dispatch = p.add_subparsers(dest="dispatch_command", required=True)
+    p = dispatch.add_parser("record", help="Grava o stream de opcodes de uma ROM")
+    p.add_argument("rom", help="Caminho da ROM ou nome de um workload do bench")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--frames", type=int, default=120)
+    p.set_defaults(func=cmd_dispatch_record)
+    p = dispatch.add_parser("run", help="Reexecuta o stream em cada estratégia")
+    p.add_argument("stream")
+    p.add_argument("--repeat", type=int, default=5, help="Repetições por estratégia (vale a melhor)")
+    p.add_argument("--json", default=None)
+    p.set_defaults(func=cmd_dispatch_run)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# Fontes de input do joypad. O run pede o estado do joypad 1x por frame com read(frame, presenter)
+# (frame = gb.frame_count, presenter = o da execução) e escreve o resultado em 0xFF00.
+# O estado tem 1 bit por botão, 1 = pressionado, no formato de frontend.BUTTONS.
+
+
+class KeyboardInput:
+    # Teclado: o snapshot que o presenter tira no poll()
+    __slots__ = []
+
+    def read(self, frame, presenter):
+        return presenter.joypad
+
+
+class ScriptInput:
+    # Lista de (frame, joypad) ordenada por frame: o joypad vale a partir daquele frame
+    # (input_script do bench, ramos do fork_many, reprodução de movies)
+    __slots__ = ['events', 'pos', 'joypad']
+
+    def __init__(self, events):
+        self.events = events
+        self.pos = 0
+        self.joypad = 0
+
+    def read(self, frame, presenter):
+        events = self.events
+        pos = self.pos
+        while pos < len(events) and events[pos][0] <= frame:
+            self.joypad = events[pos][1]
+            pos += 1
+        self.pos = pos
+        return self.joypad
+
+
+class RecordingInput:
+    # Repassa outra fonte e anota só as mudanças: [(frame, joypad)]
+    __slots__ = ['source', 'events', 'joypad']
+
+    def __init__(self, source, events=None):
+        self.source = source
+        self.events = [] if events is None else events
+        self.joypad = 0
+
+    def read(self, frame, presenter):
+        joypad = self.source.read(frame, presenter)
+        if joypad != self.joypad:
+            self.joypad = joypad
+            self.events.append((frame, joypad))
+        return joypad
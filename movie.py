@@ -0,0 +1,118 @@
+import struct
+import zlib
+
+from inputs import KeyboardInput, RecordingInput, ScriptInput
+
+# Movies: o input de uma sessão gravado como mudanças do joypad indexadas por frame.
+# Reproduzir = partir do mesmo estado inicial (power-on ou save state embutido) e alimentar o
+# run com as mesmas mudanças nos mesmos frames: a emulação é determinística, então o resultado
+# é bit a bit o mesmo, headless e sem limite de velocidade.
+#   cabeçalho (MOVIE_HEADER) | save state inicial (zlib, opcional) | eventos (EVENT)
+# Cada evento guarda quantos frames se passaram desde o anterior (o primeiro, desde o frame inicial).
+# O APU escreve nos registradores de som (0xFF10-0xFF26): uma sessão gravada com áudio só se
+# repete bit a bit com o APU emulado de novo, então o cabeçalho marca isso (MOVIE_FLAG_APU).
+
+MOVIE_MAGIC = b"GBMV"
+MOVIE_VERSION = 2
+# magic, versão, flags, CRC32 da ROM, frame inicial, frame final, nº de eventos,
+# tamanho do save state inicial comprimido (0 = power-on)
+MOVIE_HEADER = struct.Struct("<4sHHIQQII")
+EVENT = struct.Struct("<IB") # frames desde o evento anterior, joypad
+
+MOVIE_FLAG_APU = 0x0001 # Gravado com o APU emulado (run com audio=...)
+
+
+class MovieError(ValueError):
+    pass
+
+
+class Movie:
+    __slots__ = ['rom_checksum', 'start_state', 'start_frame', 'end_frame', 'events', 'apu']
+
+    def __init__(self, rom_checksum, start_state=None, start_frame=0, end_frame=0, events=None, apu=False):
+        self.rom_checksum = rom_checksum
+        self.start_state = start_state # Save state inicial (bytes) ou None = power-on
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.events = [] if events is None else events # [(frame, joypad)] com frames absolutos
+        self.apu = apu # Gravado com o APU emulado: a reprodução também precisa dele
+
+    def frames(self):
+        return self.end_frame - self.start_frame
+
+
+def begin_recording(gb, source=None, apu=False):
+    # Grava a partir do estado atual de gb: power-on logo depois do load_rom, senão embute um save state.
+    # apu: o run vai receber audio=... (o APU emulado faz parte do resultado).
+    # Devolve o movie e a fonte de input para o run (input_source); depois do run, finish_recording.
+    power_on = gb.frame_count == 0 and not gb.state_loaded
+    movie = Movie(gb.rom_checksum, None if power_on else bytes(gb.save_state()), gb.frame_count, apu=apu)
+    return movie, RecordingInput(source or KeyboardInput(), movie.events)
+
+
+def finish_recording(gb, movie):
+    movie.end_frame = gb.frame_count
+
+
+def start_playback(gb, movie):
+    # Coloca gb no estado inicial do movie e devolve a fonte de input para o run.
+    # gb precisa estar logo depois do load_rom (power-on)
+    if movie.rom_checksum != gb.rom_checksum:
+        raise MovieError(f"movie de outra ROM (CRC32 {movie.rom_checksum:08X}, carregada {gb.rom_checksum:08X})")
+    if movie.start_state is not None:
+        gb.load_state(movie.start_state)
+    elif gb.frame_count != 0:
+        raise MovieError("movie começa no power-on: carregue a ROM de novo antes de reproduzir")
+    return ScriptInput(movie.events)
+
+
+def playback_audio(movie):
+    # Saída de áudio da reprodução: o APU roda (sem som) se o movie foi gravado com ele
+    if not movie.apu:
+        return None
+    from apu import NullSink
+    return NullSink()
+
+
+def play(gb, movie, **options):
+    # Reproduz o movie inteiro; options vão para o run (headless, speed, on_frame...)
+    options.setdefault("audio", playback_audio(movie))
+    gb.run(input_source=start_playback(gb, movie), max_frames=movie.end_frame, **options)
+
+
+def save_movie(movie, path):
+    state = zlib.compress(movie.start_state) if movie.start_state is not None else b""
+    flags = MOVIE_FLAG_APU if movie.apu else 0
+    out = bytearray(MOVIE_HEADER.pack(MOVIE_MAGIC, MOVIE_VERSION, flags, movie.rom_checksum, movie.start_frame,
+                                      movie.end_frame, len(movie.events), len(state)))
+    out += state
+    previous = movie.start_frame
+    for frame, joypad in movie.events:
+        out += EVENT.pack(frame - previous, joypad)
+        previous = frame
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def load_movie(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MOVIE_HEADER.size:
+        raise MovieError("movie truncado")
+    magic, version, flags, checksum, start_frame, end_frame, count, state_size = MOVIE_HEADER.unpack_from(data, 0)
+    if magic != MOVIE_MAGIC:
+        raise MovieError("não é um movie")
+    if version != MOVIE_VERSION:
+        raise MovieError(f"movie versão {version} (esperada {MOVIE_VERSION})")
+    pos = MOVIE_HEADER.size
+    if len(data) != pos + state_size + count * EVENT.size:
+        raise MovieError(f"movie com {len(data)} bytes (esperados {pos + state_size + count * EVENT.size})")
+
+    start_state = zlib.decompress(data[pos : pos + state_size]) if state_size else None
+    pos += state_size
+    events = []
+    frame = start_frame
+    for delta, joypad in EVENT.iter_unpack(data[pos:]):
+        frame += delta
+        events.append((frame, joypad))
+    return Movie(checksum, start_state, start_frame, end_frame, events, bool(flags & MOVIE_FLAG_APU))
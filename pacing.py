@@ -0,0 +1,92 @@
+import time
+
+# Frequência real do DMG: 4194304 Hz / 70224 ciclos por frame = ~59.7275 Hz
+# (clock.tick(60) roda 0.45% rápido demais e tem granularidade de 1 ms)
+CYCLES_PER_FRAME = 70224
+DMG_FPS = 4194304 / CYCLES_PER_FRAME
+
+# Margem que fica para o spin no perf_counter depois do sleep
+# (o sleep do SO pode acordar até ~1-2 ms atrasado)
+SPIN_MARGIN = 0.002
+
+# Intervalo de atualização da velocidade medida
+REPORT_INTERVAL = 0.5
+
+
+class FramePacer:
+    # Controla o ritmo dos frames.
+    # speed=1.0: tempo real preciso (sleep híbrido + spin no perf_counter)
+    # speed=2.0, 4.0...: multiplicador fixo
+    # speed=None (ou 0): sem limite, nunca dorme (batch / benchmarks)
+    # fast_forward=True (tecla segurada no frontend): usa fast_forward_speed enquanto segurada
+    __slots__ = ['speed', 'fast_forward_speed', 'frame_time', 'deadline',
+                 'achieved_speed', 'report_start', 'report_frames']
+
+    def __init__(self, speed=1.0, fast_forward_speed=None):
+        self.speed = speed or None
+        self.fast_forward_speed = fast_forward_speed or None
+        self.frame_time = 1.0 / (DMG_FPS * self.speed) if self.speed else 0.0
+        self.deadline = time.perf_counter()
+
+        self.achieved_speed = 0.0 # Velocidade medida (1.0 = 100% do DMG real)
+        self.report_start = self.deadline
+        self.report_frames = 0
+
+    def wait(self, fast_forward=False):
+        # Chamado 1x por frame emulado. Retorna True quando achieved_speed foi atualizado.
+        speed = self.fast_forward_speed if fast_forward else self.speed
+        self.frame_time = 1.0 / (DMG_FPS * speed) if speed else 0.0
+
+        now = time.perf_counter()
+        if speed:
+            self.deadline += self.frame_time
+            remaining = self.deadline - now
+
+            if remaining > 0.0:
+                if remaining > SPIN_MARGIN:
+                    time.sleep(remaining - SPIN_MARGIN)
+                while time.perf_counter() < self.deadline:
+                    pass
+                now = self.deadline
+            elif remaining < -self.frame_time:
+                # Muito atrasado (janela arrastada, breakpoint...): não tenta recuperar em rajada
+                self.deadline = now
+        else:
+            self.deadline = now
+
+        return self._report(now)
+
+    def _report(self, now):
+        self.report_frames += 1
+        elapsed = now - self.report_start
+        if elapsed >= REPORT_INTERVAL:
+            self.achieved_speed = self.report_frames / (elapsed * DMG_FPS)
+            self.report_start = now
+            self.report_frames = 0
+            return True
+        return False
+
+
+class AudioPacer(FramePacer):
+    # speed="audio": o ritmo é ditado pela demanda do dispositivo de áudio.
+    # Em vez de dormir até um horário, espera o ring buffer do áudio baixar até o alvo
+    # (audio_sink.wait_for_room). O DRC do sink mantém o buffer estável, então não há
+    # deriva entre o relógio do áudio e o da emulação. Fast-forward não espera.
+    # Se o dispositivo parar de consumir (wait_for_room estourou o prazo), volta ao ritmo
+    # por tempo do FramePacer até o buffer ter espaço de novo (o excesso é descartado no push).
+    __slots__ = ['audio_sink', 'stalled']
+
+    def __init__(self, audio_sink):
+        super().__init__(1.0)
+        self.audio_sink = audio_sink
+        self.stalled = False
+
+    def wait(self, fast_forward=False):
+        if self.stalled:
+            if not self.audio_sink.has_room():
+                return super().wait(fast_forward)
+            self.stalled = False
+        if not fast_forward and not self.audio_sink.wait_for_room():
+            self.stalled = True
+            self.deadline = time.perf_counter()
+        return self._report(time.perf_counter())
@@ -0,0 +1,460 @@
+import bisect
+import csv
+import os
+import time
+from array import array
+
+# Profilers do interpretador (modo instrumentado do GameBoy.run).
+# Com o modo desligado, o loop paga só os testes de uma flag local (instrumented).
+
+# --- Nomes dos opcodes (para os relatórios) ---
+
+_R = ["B", "C", "D", "E", "H", "L", "(HL)", "A"]
+_RP = ["BC", "DE", "HL", "SP"]
+_RP2 = ["BC", "DE", "HL", "AF"]
+_CC = ["NZ", "Z", "NC", "C"]
+_ALU = ["ADD A,", "ADC A,", "SUB ", "SBC A,", "AND ", "XOR ", "OR ", "CP "]
+_ROT = ["RLC", "RRC", "RL", "RR", "SLA", "SRA", "SWAP", "SRL"]
+
+
+def mnemonic(op):
+    # Mesma decodificação x/y/z/p/q do núcleo
+    x = op >> 6
+    y = (op >> 3) & 7
+    z = op & 7
+    p = y >> 1
+    q = y & 1
+    if x == 0:
+        if z == 0:
+            return ["NOP", "LD (nn),SP", "STOP", "JR e"][y] if y < 4 else f"JR {_CC[y - 4]},e"
+        if z == 1:
+            return f"LD {_RP[p]},nn" if q == 0 else f"ADD HL,{_RP[p]}"
+        if z == 2:
+            target = ["(BC)", "(DE)", "(HL+)", "(HL-)"][p]
+            return f"LD {target},A" if q == 0 else f"LD A,{target}"
+        if z == 3:
+            return f"{'INC' if q == 0 else 'DEC'} {_RP[p]}"
+        if z == 4:
+            return f"INC {_R[y]}"
+        if z == 5:
+            return f"DEC {_R[y]}"
+        if z == 6:
+            return f"LD {_R[y]},n"
+        return ["RLCA", "RRCA", "RLA", "RRA", "DAA", "CPL", "SCF", "CCF"][y]
+    if x == 1:
+        return "HALT" if op == 0x76 else f"LD {_R[y]},{_R[z]}"
+    if x == 2:
+        return f"{_ALU[y]}{_R[z]}"
+    if z == 0:
+        return f"RET {_CC[y]}" if y < 4 else ["LDH (n),A", "ADD SP,e", "LDH A,(n)", "LD HL,SP+e"][y - 4]
+    if z == 1:
+        return f"POP {_RP2[p]}" if q == 0 else ["RET", "RETI", "JP HL", "LD SP,HL"][p]
+    if z == 2:
+        return f"JP {_CC[y]},nn" if y < 4 else ["LD (C),A", "LD (nn),A", "LD A,(C)", "LD A,(nn)"][y - 4]
+    if z == 3:
+        return {0: "JP nn", 1: "PREFIX CB", 6: "DI", 7: "EI"}.get(y, "-")
+    if z == 4:
+        return f"CALL {_CC[y]},nn" if y < 4 else "-"
+    if z == 5:
+        if q == 0:
+            return f"PUSH {_RP2[p]}"
+        return "CALL nn" if p == 0 else "-"
+    if z == 6:
+        return f"{_ALU[y]}n"
+    return f"RST {y * 8:02X}h"
+
+
+def cb_mnemonic(op):
+    x = op >> 6
+    y = (op >> 3) & 7
+    z = op & 7
+    if x == 0:
+        return f"{_ROT[y]} {_R[z]}"
+    return f"{['BIT', 'RES', 'SET'][x - 1]} {y},{_R[z]}"
+
+
+# --- Custo por opcode no host ---
+
+# Índices dos contadores: 0-255 opcodes, 256-511 opcodes CB e 3 entradas especiais
+CB_BASE = 256
+SLOT_INTERRUPT = 512 # Dispatch de interrupção (push do PC + salto para o vetor)
+SLOT_HALTED = 513    # Iteração com a CPU em HALT
+SLOT_TAIL = 514      # Cauda do loop: timer, DIV, ppu_update, serial
+SLOT_COUNT = 515
+
+
+def slot_name(slot):
+    if slot < CB_BASE:
+        return f"{slot:02X}", mnemonic(slot)
+    if slot < SLOT_INTERRUPT:
+        return f"CB {slot - CB_BASE:02X}", cb_mnemonic(slot - CB_BASE)
+    return "--", {SLOT_INTERRUPT: "(interrupção)", SLOT_HALTED: "(halt)", SLOT_TAIL: "(timer/PPU)"}[slot]
+
+
+def clock_overhead_ns():
+    # Custo de uma leitura do perf_counter_ns (descontado de cada intervalo medido)
+    ns = time.perf_counter_ns
+    best = None
+    for _ in range(5):
+        start = ns()
+        for _ in range(10000):
+            t = ns()
+            t = ns() - t
+        elapsed = (ns() - start) / 10000 / 2
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class OpcodeProfiler:
+    # Conta execuções de TODOS os opcodes e mede o tempo de host (perf_counter_ns) de
+    # 1 a cada `sample_rate` iterações do loop. O custo total estimado de um opcode é
+    # (tempo médio por amostra - custo da própria medição) x execuções.
+    __slots__ = ['sample_rate', 'counts', 'samples', 'times', 'timer_overhead']
+
+    def __init__(self, sample_rate=16):
+        self.sample_rate = max(1, int(sample_rate))
+        self.counts = [0] * SLOT_COUNT
+        self.samples = [0] * SLOT_COUNT
+        self.times = [0] * SLOT_COUNT # ns somados das amostras
+        self.timer_overhead = clock_overhead_ns()
+
+    def rows(self):
+        # [(slot, execuções, ns médio, ns total estimado)], ordenado pelo custo total
+        rows = []
+        for slot in range(SLOT_COUNT):
+            count = self.counts[slot]
+            if not count:
+                continue
+            if self.samples[slot]:
+                mean = max(0.0, self.times[slot] / self.samples[slot] - self.timer_overhead)
+            else:
+                mean = 0.0
+            rows.append((slot, count, mean, mean * count))
+        rows.sort(key=lambda r: -r[3])
+        return rows
+
+    def format_table(self, top=40):
+        rows = self.rows()
+        total = sum(r[3] for r in rows) or 1.0
+        lines = [f"{'OPCODE':<6} {'INSTRUÇÃO':<14} {'EXECUÇÕES':>11} {'NS/EXEC':>8} {'TOTAL MS':>9} {'%':>6} {'ACUM.':>6}"]
+        acc = 0.0
+        for slot, count, mean, cost in rows[:top]:
+            acc += cost
+            code, name = slot_name(slot)
+            lines.append(f"{code:<6} {name:<14} {count:>11} {mean:>8.0f} {cost / 1e6:>9.1f} "
+                         f"{cost / total:>6.1%} {acc / total:>6.1%}")
+        lines.append(f"(1 amostra a cada {self.sample_rate} iterações, "
+                     f"medição de {self.timer_overhead:.0f} ns descontada)")
+        return "\n".join(lines)
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["opcode", "mnemonic", "count", "samples", "mean_ns", "total_ns"])
+            for slot, count, mean, cost in self.rows():
+                code, name = slot_name(slot)
+                writer.writerow([code, name, count, self.samples[slot], f"{mean:.1f}", f"{cost:.0f}"])
+
+
+# --- Tempo de cada subsistema por frame ---
+
+# Campos (ms por frame):
+#   cpu:    execução das instruções e dispatch de interrupções (amostrado)
+#   timer:  DIV e TIMA (amostrado)
+#   ppu:    máquina de estados da PPU, sem o desenho das linhas (amostrado)
+#   render: render_scanline/render_sprites (exato)
+#   apu:    síntese do áudio do frame (exato)
+#   upload: entrega do framebuffer (escala/filtro + blit, ou cópia no modo threaded)
+#   flip:   pygame.display.flip
+#   events: eventos, joypad
+#   frame:  frame inteiro, sem a espera do pacer
+FRAME_FIELDS = ("cpu", "timer", "ppu", "render", "apu", "upload", "flip", "events", "frame")
+
+
+class FrameTimers:
+    # Guarda os últimos `window` frames de cada campo (ring) para médias móveis e percentis.
+    # As partes por instrução (cpu, timer, ppu) vêm de 1 amostra a cada `sample_rate`
+    # iterações do loop, escaladas pelo número de iterações do frame.
+    __slots__ = ['window', 'sample_rate', 'timer_overhead', 'history', 'pos', 'frames']
+
+    def __init__(self, window=300, sample_rate=32):
+        self.window = window
+        self.sample_rate = max(1, int(sample_rate))
+        self.timer_overhead = clock_overhead_ns()
+        self.history = {field: [0.0] * window for field in FRAME_FIELDS}
+        self.pos = 0
+        self.frames = 0 # Total de frames registrados
+
+    def add(self, values):
+        # values: tupla na ordem de FRAME_FIELDS, em ms
+        pos = self.pos
+        for field, value in zip(FRAME_FIELDS, values):
+            self.history[field][pos] = value
+        self.pos = (pos + 1) % self.window
+        self.frames += 1
+
+    def _values(self, field):
+        n = min(self.frames, self.window)
+        return self.history[field][:n] if n < self.window else self.history[field]
+
+    def mean(self, field):
+        values = self._values(field)
+        return sum(values) / len(values) if values else 0.0
+
+    def percentiles(self, field, points=(50, 95, 99)):
+        values = sorted(self._values(field))
+        if not values:
+            return tuple(0.0 for _ in points)
+        last = len(values) - 1
+        return tuple(values[min(last, int(round(p / 100 * last)))] for p in points)
+
+    def summary(self):
+        # {campo: {"mean", "p50", "p95", "p99"}} da janela atual
+        result = {}
+        for field in FRAME_FIELDS:
+            p50, p95, p99 = self.percentiles(field)
+            result[field] = {"mean": self.mean(field), "p50": p50, "p95": p95, "p99": p99}
+        return result
+
+    def format_caption(self):
+        # Leitura curta para o título da janela (médias em ms)
+        parts = [f"{field} {self.mean(field):.1f}" for field in FRAME_FIELDS if field != "frame"]
+        return " ".join(parts) + f" | frame {self.mean('frame'):.1f} ms"
+
+    def format_table(self):
+        lines = [f"{'SUBSISTEMA':<10} {'MÉDIA':>8} {'P50':>8} {'P95':>8} {'P99':>8}  (ms/frame, últimos "
+                 f"{min(self.frames, self.window)} frames)"]
+        for field, stats in self.summary().items():
+            lines.append(f"{field:<10} {stats['mean']:>8.2f} {stats['p50']:>8.2f} {stats['p95']:>8.2f} "
+                         f"{stats['p99']:>8.2f}")
+        return "\n".join(lines)
+
+
+# --- Profiler do código do jogo (PC emulado) ---
+
+def load_sym(path):
+    # Arquivo .sym do RGBDS ("BB:AAAA Nome", comentários com ';').
+    # Devolve {banco: ([endereços], [nomes])} com os endereços ordenados.
+    banks = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split(";", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            if len(parts) != 2 or ":" not in parts[0]:
+                continue
+            bank, addr = parts[0].split(":", 1)
+            try:
+                bank, addr = int(bank, 16), int(addr, 16)
+            except ValueError:
+                continue
+            banks.setdefault(bank, []).append((addr, parts[1].strip()))
+    return {bank: ([a for a, _ in sorted(labels)], [n for _, n in sorted(labels)])
+            for bank, labels in banks.items()}
+
+
+def sym_path_for(rom_path):
+    # O .sym fica ao lado da ROM, com o mesmo nome
+    path = os.path.splitext(rom_path)[0] + ".sym"
+    return path if os.path.exists(path) else None
+
+
+def _region(addr):
+    # ROM fixa, ROM com banco, e a RAM em pedaços de 8 KB (VRAM, SRAM, WRAM, eco/HRAM)
+    return addr >> 14 if addr < 0x8000 else addr >> 13
+
+
+def find_label(symbols, bank, addr):
+    # (nome, endereço do rótulo) mais próximo antes de addr, no banco (ou no banco 0 para a
+    # área fixa e a RAM, que o rgblink às vezes lista sem banco)
+    for b in (bank, 0) if bank else (0,):
+        entry = symbols.get(b)
+        if entry is None:
+            continue
+        addrs, names = entry
+        i = bisect.bisect_right(addrs, addr) - 1
+        # Rótulo de outra região (ex: ROM fixa para um PC no banco, WRAM para um PC na HRAM) não vale
+        if i >= 0 and _region(addrs[i]) == _region(addr):
+            return names[i], addrs[i]
+    return None, None
+
+
+class GuestProfiler:
+    # Amostra o PC emulado a cada `interval` ciclos (só contagem num array, sem relógio do host).
+    # O índice do histograma separa os bancos: offset na ROM (banco * 0x4000 + endereço
+    # dentro do banco) e, depois da ROM, os endereços 0x8000-0xFFFF (código na WRAM/HRAM).
+    __slots__ = ['interval', 'rom_size', 'histogram', 'symbols']
+
+    def __init__(self, interval=64, symbols=None):
+        self.interval = max(1, int(interval))
+        self.rom_size = 0
+        self.histogram = None
+        self.symbols = symbols or {} # load_sym()
+
+    def attach(self, rom_size):
+        # Chamado pelo GameBoy.run; mantém as amostras se a mesma ROM rodar de novo
+        rom_size = max(rom_size, 0x8000)
+        if self.histogram is None or self.rom_size != rom_size:
+            self.rom_size = rom_size
+            self.histogram = array("I", bytes(4 * (rom_size + 0x8000)))
+
+    def location(self, index):
+        # (banco, endereço na CPU) de um índice do histograma
+        if index < self.rom_size:
+            bank = index >> 14
+            return bank, (index & 0x3FFF) | (0x4000 if bank else 0)
+        return 0, 0x8000 + index - self.rom_size
+
+    def label(self, bank, addr):
+        return find_label(self.symbols, bank, addr)
+
+    @property
+    def total(self):
+        return sum(self.histogram) if self.histogram is not None else 0
+
+    def hot_spots(self, gap=16):
+        # Faixas quentes: com .sym, uma faixa por rótulo (rotina); sem, endereços amostrados
+        # que distam até `gap` bytes uns dos outros viram uma faixa só.
+        # Devolve [(amostras, banco, início, fim, rótulo)] ordenado por amostras.
+        spots = {}
+        current = None
+        hist = self.histogram
+        if hist is None:
+            return []
+        for index, count in enumerate(hist):
+            if not count:
+                continue
+            bank, addr = self.location(index)
+            name, start = self.label(bank, addr) if self.symbols else (None, None)
+            if name is not None:
+                key = (bank, start, name)
+            elif current is not None and current[0] == bank and current[3] is None and addr - current[2] <= gap:
+                key = current[:2] + (None,)
+            else:
+                key = (bank, addr, None)
+            spot = spots.get(key)
+            if spot is None:
+                spot = spots[key] = [0, bank, addr, addr, name]
+            spot[0] += count
+            spot[2] = min(spot[2], addr)
+            spot[3] = max(spot[3], addr)
+            current = (bank, key[1], spot[3], name)
+        return sorted((tuple(s) for s in spots.values()), key=lambda s: -s[0])
+
+    def format_table(self, top=30):
+        spots = self.hot_spots()
+        total = sum(s[0] for s in spots) or 1
+        lines = [f"{'FAIXA':<17} {'AMOSTRAS':>9} {'%':>6} {'ACUM.':>6}  ROTINA"]
+        acc = 0
+        for count, bank, start, end, name in spots[:top]:
+            acc += count
+            lines.append(f"{bank:02X}:{start:04X}-{end:04X}     {count:>9} {count / total:>6.1%} "
+                         f"{acc / total:>6.1%}  {name or ''}")
+        lines.append(f"({total} amostras, 1 a cada {self.interval} ciclos"
+                     f"{'' if self.symbols else ', sem .sym'})")
+        return "\n".join(lines)
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["bank", "start", "end", "label", "samples"])
+            for count, bank, start, end, name in self.hot_spots():
+                writer.writerow([f"{bank:02X}", f"{start:04X}", f"{end:04X}", name or "", count])
+
+
+# --- Pilha de chamadas do jogo (flamegraph) ---
+
+# Opcodes que empilham o endereço de retorno: CALL nn, CALL cc,nn e RST
+CALL_OPCODES = frozenset((0xCD, 0xC4, 0xCC, 0xD4, 0xDC,
+                          0xC7, 0xCF, 0xD7, 0xDF, 0xE7, 0xEF, 0xF7, 0xFF))
+INTERRUPT_KEY = 1 << 24 # Marca as entradas por interrupção na chave do nó
+INTERRUPT_NAMES = {0x40: "VBlank", 0x48: "STAT", 0x50: "Timer", 0x58: "Serial", 0x60: "Joypad"}
+
+
+class CallStackTracker:
+    # Pilha sombra das chamadas do jogo, mantida pelo GameBoy.run: CALL/RST/interrupção
+    # empilham, e qualquer instrução que deixe o SP ACIMA do endereço de retorno de um
+    # quadro desempilha o quadro (RET/RETI, mas também POP do endereço de retorno, LD SP,
+    # ADD SP...). Assim jogos que mexem no SP direto não dessincronizam a pilha.
+    # Os ciclos emulados vão para o nó da árvore de caminhos em que a instrução rodou.
+    # Nó: chave (banco << 16 | endereço, + INTERRUPT_KEY), pai e filhos; o nó 0 é a raiz.
+    # A pilha tem no máximo `max_depth` quadros: chamadas além disso não são empilhadas (nem
+    # criam caminhos) e, como o desempilhar é pelo SP, o retorno delas não tira quadro nenhum.
+    __slots__ = ['symbols', 'max_depth', 'keys', 'parents', 'children', 'cycles', 'calls', 'node', 'stack',
+                 'callers']
+
+    def __init__(self, symbols=None, max_depth=64):
+        self.symbols = symbols or {} # load_sym()
+        self.max_depth = max_depth
+        self.keys = [None]
+        self.parents = [0]
+        self.children = [{}]
+        self.cycles = [0]
+        self.calls = [0]
+        self.node = 0   # Nó atual (sincronizado pelo run no fim de cada frame)
+        self.stack = [] # SP de cada quadro (endereço do retorno na pilha do jogo)
+        self.callers = [] # Nó de quem chamou, por quadro (volta para ele no retorno)
+
+    def child(self, node, key):
+        # Nó do caminho node -> key (cria na primeira chamada)
+        children = self.children[node]
+        child = children.get(key)
+        if child is None:
+            child = children[key] = len(self.keys)
+            self.keys.append(key)
+            self.parents.append(node)
+            self.children.append({})
+            self.cycles.append(0)
+            self.calls.append(0)
+        self.calls[child] += 1
+        return child
+
+    def name(self, key):
+        if key is None:
+            return "(raiz)"
+        bank, addr = (key >> 16) & 0xFF, key & 0xFFFF
+        label, start = find_label(self.symbols, bank, addr)
+        if label is None:
+            text = f"{bank:02X}:{addr:04X}"
+        else:
+            text = label if start == addr else f"{label}+{addr - start:X}"
+        if key & INTERRUPT_KEY:
+            return f"[{INTERRUPT_NAMES.get(addr, 'int')}] {text}"
+        return text
+
+    def path(self, node):
+        names = []
+        while node:
+            names.append(self.name(self.keys[node]))
+            node = self.parents[node]
+        names.append(self.name(None))
+        return names[::-1]
+
+    def collapsed(self):
+        # Formato "collapsed stacks" (flamegraph.pl, inferno, speedscope): "a;b;c ciclos"
+        lines = []
+        for node, cycles in enumerate(self.cycles):
+            if cycles:
+                # ';' separa os quadros: não pode aparecer nos nomes
+                lines.append(";".join(n.replace(";", ":") for n in self.path(node)) + f" {cycles}")
+        return lines
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+
+    def format_table(self, top=30):
+        # Tempo inclusivo (rotina + tudo que ela chamou) por caminho
+        inclusive = list(self.cycles)
+        for node in range(len(self.keys) - 1, 0, -1):
+            inclusive[self.parents[node]] += inclusive[node]
+        total = inclusive[0] or 1
+        order = sorted(range(1, len(self.keys)), key=lambda n: -inclusive[n])
+        lines = [f"{'INCLUSIVO':>9} {'PRÓPRIO':>8} {'CHAMADAS':>9}  CAMINHO"]
+        for node in order[:top]:
+            lines.append(f"{inclusive[node] / total:>9.1%} {self.cycles[node] / total:>8.1%} "
+                         f"{self.calls[node]:>9}  {' > '.join(self.path(node)[1:])}")
+        lines.append(f"({total} ciclos, {len(self.keys) - 1} caminhos, profundidade atual {len(self.stack)})")
+        return "\n".join(lines)
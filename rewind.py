@@ -0,0 +1,132 @@
+import sys
+import time
+import zlib
+from collections import deque
+
+from pacing import DMG_FPS
+from savestate import CORE, CORE_OFFSET, FRAMEBUFFER_OFFSET, FRAMEBUFFER_SIZE, MEMORY_OFFSET, STATE_SIZE
+
+# Rewind: um save state a cada `interval` frames num anel de memória limitada.
+# Só o estado mais novo fica inteiro (shadow); cada estado mais velho é guardado como o XOR
+# dele com o seguinte, comprimido com zlib num nível baixo.
+# O XOR só cobre o que pode ter mudado: cabeçalho + núcleo, as páginas de 256 bytes que o
+# jogo escreveu desde a captura anterior (gb.frame_dirty_pages) e o framebuffer se ele mudou.
+# Assim o custo da captura acompanha o que o jogo escreveu, e não os 88 KB do estado.
+# A área da ROM (0x0000-0x7FFF) fica de fora: ela só muda com a troca de banco, e o banco
+# está no núcleo. Antes de carregar, o banco certo é copiado do cartucho para o shadow.
+# Voltar = desfazer o XOR do delta mais novo; quando o anel enche, os deltas mais velhos saem.
+
+PAGE_SIZE = 256
+FIRST_RAM_PAGE = 0x80 # 0x8000: VRAM em diante
+ALL_PAGES = int.from_bytes(b"\x01" * 256, "little") # Máscara com as 256 páginas sujas
+
+
+def segments(pages, framebuffer_changed):
+    # (offset, tamanho) no save state das partes cobertas por um delta
+    segs = [(0, MEMORY_OFFSET)]
+    for page in range(FIRST_RAM_PAGE, 256):
+        if pages[page]:
+            segs.append((MEMORY_OFFSET + page * PAGE_SIZE, PAGE_SIZE))
+    if framebuffer_changed:
+        segs.append((FRAMEBUFFER_OFFSET, FRAMEBUFFER_SIZE))
+    return segs
+
+
+class RewindBuffer:
+    __slots__ = ['interval', 'max_bytes', 'level', 'deltas', 'used_bytes', 'shadow', 'scratch', 'pending',
+                 'fresh', 'countdown', 'captures', 'capture_time']
+
+    def __init__(self, interval=1, max_mb=64, level=1):
+        self.interval = max(1, int(interval))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.level = level
+        self.deltas = deque()  # Mais velho à esquerda
+        self.used_bytes = 0
+        self.shadow = None     # Estado mais novo, inteiro
+        self.scratch = bytearray(STATE_SIZE) # save_state escreve aqui (sem alocar)
+        self.pending = ALL_PAGES # Páginas escritas desde a última captura (1 byte por página)
+        self.fresh = False     # True logo depois de uma captura: o primeiro passo volta para ela
+        self.countdown = 1
+        self.captures = 0
+        self.capture_time = 0.0
+
+    def capture(self, gb):
+        # Chamado no fim de cada frame (estado sincronizado); captura 1 a cada `interval`
+        self.pending |= int.from_bytes(gb.frame_dirty_pages, "little")
+        self.countdown -= 1
+        if self.countdown > 0:
+            return
+        self.countdown = self.interval
+        start = time.perf_counter()
+
+        state = memoryview(gb.save_state(self.scratch))
+        if self.shadow is None:
+            self.shadow = bytearray(state)
+        else:
+            shadow = memoryview(self.shadow)
+            pages = self.pending.to_bytes(PAGE_SIZE, "little")
+            framebuffer_changed = shadow[FRAMEBUFFER_OFFSET:] != state[FRAMEBUFFER_OFFSET:]
+            segs = segments(pages, framebuffer_changed)
+            old = b"".join([shadow[o : o + n] for o, n in segs])
+            new = b"".join([state[o : o + n] for o, n in segs])
+            xor = (int.from_bytes(old, "little") ^ int.from_bytes(new, "little")).to_bytes(len(old), "little")
+            delta = zlib.compress(pages + bytes((framebuffer_changed,)) + xor, self.level)
+            for o, n in segs:
+                shadow[o : o + n] = state[o : o + n]
+
+            self.deltas.append(delta)
+            self.used_bytes += sys.getsizeof(delta)
+            while self.used_bytes > self.max_bytes and self.deltas:
+                self.used_bytes -= sys.getsizeof(self.deltas.popleft())
+        self.pending = 0
+        self.fresh = True
+
+        self.captures += 1
+        self.capture_time += time.perf_counter() - start
+
+    def step_back(self, gb):
+        # Carrega o estado capturado anterior (o run recarrega no fim do frame).
+        # Devolve False quando não há mais para onde voltar: no estado mais velho ele é
+        # recarregado de novo (o jogo fica parado nele enquanto a tecla estiver segurada).
+        if self.shadow is None:
+            return False
+        moved = True
+        if self.fresh:
+            self.fresh = False # Primeiro passo: volta para a última captura
+        elif self.deltas:
+            delta = self.deltas.pop()
+            self.used_bytes -= sys.getsizeof(delta)
+            data = zlib.decompress(delta)
+            segs = segments(data[:PAGE_SIZE], data[PAGE_SIZE])
+            shadow = memoryview(self.shadow)
+            current = b"".join([shadow[o : o + n] for o, n in segs])
+            older = memoryview((int.from_bytes(current, "little") ^
+                                int.from_bytes(data[PAGE_SIZE + 1:], "little")).to_bytes(len(current), "little"))
+            pos = 0
+            for o, n in segs:
+                shadow[o : o + n] = older[pos : pos + n]
+                pos += n
+        else:
+            moved = False
+        # Banco da ROM daquele estado: a área da ROM não entra na captura nem nos deltas,
+        # então o shadow pode ter o banco de outro momento (vale também para o primeiro passo)
+        rom_bank = CORE.unpack_from(self.shadow, CORE_OFFSET)[7]
+        bank = memoryview(gb.cart_rom)[rom_bank * 0x4000 : rom_bank * 0x4000 + 0x4000]
+        if len(bank) == 0x4000:
+            memoryview(self.shadow)[MEMORY_OFFSET + 0x4000 : MEMORY_OFFSET + 0x8000] = bank
+        gb.load_state(self.shadow)
+        # Os frames emulados durante o rewind não passam pelo capture: a próxima captura
+        # compara tudo. E sai `interval` frames depois de soltar a tecla.
+        self.pending = ALL_PAGES
+        self.countdown = self.interval
+        return moved
+
+    def seconds(self):
+        # Quanto tempo de jogo dá para voltar
+        return len(self.deltas) * self.interval / DMG_FPS
+
+    def format_stats(self):
+        mean = self.capture_time / self.captures * 1e3 if self.captures else 0.0
+        return (f"rewind: {len(self.deltas)} estados ({self.seconds():.1f} s), "
+                f"{self.used_bytes / 1048576:.1f} de {self.max_bytes / 1048576:.0f} MB, "
+                f"captura {mean:.3f} ms ({mean / self.interval:.3f} ms/frame)")
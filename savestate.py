@@ -0,0 +1,104 @@
+import struct
+
+# Save states: um registro binário plano, versionado.
+#   cabeçalho (STATE_HEADER) | núcleo (CORE: CPU, timer, serial, MBC, PPU, contadores) | blocos crus
+# Os blocos são copiados direto de/para os bytearrays que já existem (Memory, framebuffer),
+# sem objetos intermediários: salvar e carregar ficam bem abaixo de 1 ms.
+#
+# A memória inteira (64 KB) vai junto: ela já contém o banco da ROM mapeado, a RAM do
+# cartucho (0xA000-0xBFFF), VRAM, OAM e os registradores de I/O (LCDC, STAT, LY, TIMA...).
+# O APU ainda não entra no registro (os registradores dele estão na memória, mas o estado
+# interno dos canais não): quando entrar, vira STATE_VERSION 2 com um bloco a mais.
+
+STATE_MAGIC = b"GBST"
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct("<4sHHI") # magic, versão, reservado, CRC32 da ROM
+
+# regs (B C D E H L F A), PC, SP, IME, EI agendado, HALT, HALT bug, banco da ROM, modo da PPU,
+# ciclos da scanline, DIV, TIMA, serial (ciclos restantes, byte enviado), frames, ciclos, instruções
+CORE = struct.Struct("<8sHHBBBBHBiiiiBQQQ")
+
+MEMORY_SIZE = 0x10000
+FRAMEBUFFER_SIZE = 160 * 144
+
+CORE_OFFSET = STATE_HEADER.size
+MEMORY_OFFSET = CORE_OFFSET + CORE.size
+FRAMEBUFFER_OFFSET = MEMORY_OFFSET + MEMORY_SIZE
+STATE_SIZE = FRAMEBUFFER_OFFSET + FRAMEBUFFER_SIZE
+
+ALL_PAGES = bytearray(b"\x01" * 256)
+
+
+class StateError(ValueError):
+    pass
+
+
+def pack_core(gb, out, offset=CORE_OFFSET):
+    # Só o núcleo (também usado pelo hash de estado por frame)
+    cpu = gb.CPU
+    CORE.pack_into(out, offset, bytes(cpu.regs), cpu.PC, cpu.SP, cpu.IME, cpu.ime_scheduled,
+                   cpu.HALT, cpu.HALT_BUG, gb.rom_bank, gb.ppu_mode, gb.scanline_counter,
+                   gb.div_counter, gb.tima_counter, gb.serial_counter, gb.serial_out,
+                   gb.frame_count, gb.cycle_count, gb.instruction_count)
+
+
+def save_state(gb, out=None):
+    # out: bytearray de STATE_SIZE para reaproveitar (rewind, checkpoints); senão cria um
+    if out is None:
+        out = bytearray(STATE_SIZE)
+    STATE_HEADER.pack_into(out, 0, STATE_MAGIC, STATE_VERSION, 0, gb.rom_checksum)
+    pack_core(gb, out)
+    view = memoryview(out)
+    view[MEMORY_OFFSET:FRAMEBUFFER_OFFSET] = gb.Memory
+    view[FRAMEBUFFER_OFFSET:STATE_SIZE] = gb.framebuffer
+    return out
+
+
+def check_header(gb, data):
+    if len(data) < STATE_HEADER.size:
+        raise StateError("save state truncado")
+    magic, version, _, checksum = STATE_HEADER.unpack_from(data, 0)
+    if magic != STATE_MAGIC:
+        raise StateError("não é um save state")
+    if version != STATE_VERSION:
+        raise StateError(f"save state versão {version} (esperada {STATE_VERSION})")
+    if checksum != gb.rom_checksum:
+        raise StateError(f"save state de outra ROM (CRC32 {checksum:08X}, carregada {gb.rom_checksum:08X})")
+    if len(data) != STATE_SIZE:
+        raise StateError(f"save state com {len(data)} bytes (esperados {STATE_SIZE})")
+
+
+def load_state(gb, data):
+    # Pode ser chamado fora do run ou no on_frame: o run relê o estado no fim do frame
+    check_header(gb, data)
+    (regs, pc, sp, ime, ime_scheduled, halted, halt_bug, rom_bank, ppu_mode, scanline_counter,
+     div_counter, tima_counter, serial_counter, serial_out,
+     frame_count, cycle_count, instruction_count) = CORE.unpack_from(data, CORE_OFFSET)
+
+    cpu = gb.CPU
+    cpu.regs[:] = regs
+    cpu.PC = pc; cpu.SP = sp; cpu.IME = bool(ime); cpu.ime_scheduled = bool(ime_scheduled)
+    cpu.HALT = bool(halted); cpu.HALT_BUG = bool(halt_bug)
+    gb.rom_bank = rom_bank; gb.ppu_mode = ppu_mode; gb.scanline_counter = scanline_counter
+    gb.div_counter = div_counter; gb.tima_counter = tima_counter
+    gb.serial_counter = serial_counter; gb.serial_out = serial_out
+    gb.frame_count = frame_count; gb.cycle_count = cycle_count; gb.instruction_count = instruction_count
+
+    # Cópia direta nos bytearrays existentes (a superfície do Pygame aponta para o framebuffer)
+    view = memoryview(data)
+    memoryview(gb.Memory)[:] = view[MEMORY_OFFSET:FRAMEBUFFER_OFFSET]
+    memoryview(gb.framebuffer)[:] = view[FRAMEBUFFER_OFFSET:STATE_SIZE]
+    # A memória inteira mudou: para os consumidores do fim deste frame e para o próximo
+    gb.dirty_pages[:] = ALL_PAGES
+    gb.frame_dirty_pages[:] = ALL_PAGES
+    gb.state_loaded = True
+
+
+def save_state_file(gb, path):
+    with open(path, "wb") as f:
+        f.write(save_state(gb))
+
+
+def load_state_file(gb, path):
+    with open(path, "rb") as f:
+        load_state(gb, f.read())
@@ -0,0 +1,146 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+import movie
+from savestate import CORE, pack_core
+
+# Hash do estado inteiro no fim de cada frame, para certificar que uma mudança no núcleo
+# não muda o resultado da emulação: grava-se o stream de hashes junto do movie numa versão
+# de referência e o verificador reproduz o movie em outra versão/máquina comparando frame a frame.
+#
+# Cada frame gera 2 CRC32:
+#   núcleo  - CPU, IME/HALT, banco da ROM (MBC), modo e ciclos da PPU, DIV/TIMA, serial, contadores
+#   memória - os 64 KB (ROM mapeada, VRAM, RAM do cartucho, WRAM, OAM, I/O, HRAM)
+# O hash da memória é incremental: um CRC32 por página de 256 bytes, recalculado só nas páginas
+# que o frame escreveu (gb.frame_dirty_pages), e o hash da memória é o CRC32 desses 256 CRCs.
+# O framebuffer fica de fora: ele é saída (e depende de frameskip), não estado.
+# A reprodução usa a mesma configuração de APU da gravação (movie.apu, ver movie.playback_audio).
+#
+# Arquivo: cabeçalho (HASH_HEADER) | nº de frames x (núcleo, memória) em uint32 little-endian
+
+HASH_MAGIC = b"GBHS"
+HASH_VERSION = 1
+HASH_HEADER = struct.Struct("<4sHHIQI") # magic, versão, reservado, CRC32 da ROM, frame inicial, nº de frames
+
+PAGE_SIZE = 256
+
+
+class StateHasher:
+    __slots__ = ['rom_checksum', 'start_frame', 'page_crcs', 'core', 'digests']
+
+    def __init__(self):
+        self.rom_checksum = 0
+        self.start_frame = 0
+        self.page_crcs = array("I", bytes(4 * 256))
+        self.core = bytearray(CORE.size)
+        self.digests = array("I") # (núcleo, memória) de cada frame, intercalados
+
+    def reset(self, gb):
+        # Hash completo do estado atual; os frames seguintes só recalculam as páginas sujas
+        mem = memoryview(gb.Memory)
+        crcs = self.page_crcs
+        for page in range(256):
+            crcs[page] = zlib.crc32(mem[page * PAGE_SIZE : page * PAGE_SIZE + PAGE_SIZE])
+        self.rom_checksum = gb.rom_checksum
+        self.start_frame = gb.frame_count
+        del self.digests[:]
+
+    def digest(self, gb):
+        # (núcleo, memória) no fim do frame; precisa ser chamado em todos os frames desde o reset
+        mem = memoryview(gb.Memory)
+        crcs = self.page_crcs
+        dirty = gb.frame_dirty_pages
+        crc32 = zlib.crc32
+        page = dirty.find(1)
+        while page != -1:
+            crcs[page] = crc32(mem[page * PAGE_SIZE : page * PAGE_SIZE + PAGE_SIZE])
+            page = dirty.find(1, page + 1)
+        pack_core(gb, self.core, 0)
+        return crc32(self.core), crc32(crcs)
+
+    def update(self, gb):
+        # Para usar como on_frame
+        core, memory = self.digest(gb)
+        self.digests.append(core)
+        self.digests.append(memory)
+
+    def frames(self):
+        return len(self.digests) // 2
+
+
+def hash_path_for(movie_path):
+    # O stream fica ao lado do movie: bug.gbm -> bug.gbh
+    return os.path.splitext(movie_path)[0] + ".gbh"
+
+
+def save_hashes(hasher, path):
+    digests = array("I", hasher.digests)
+    if sys.byteorder == "big":
+        digests.byteswap()
+    with open(path, "wb") as f:
+        f.write(HASH_HEADER.pack(HASH_MAGIC, HASH_VERSION, 0, hasher.rom_checksum,
+                                 hasher.start_frame, hasher.frames()))
+        f.write(digests.tobytes())
+
+
+def load_hashes(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HASH_HEADER.size:
+        raise movie.MovieError("stream de hashes truncado")
+    magic, version, _, checksum, start_frame, frames = HASH_HEADER.unpack_from(data, 0)
+    if magic != HASH_MAGIC:
+        raise movie.MovieError("não é um stream de hashes")
+    if version != HASH_VERSION:
+        raise movie.MovieError(f"stream de hashes versão {version} (esperada {HASH_VERSION})")
+    if len(data) != HASH_HEADER.size + frames * 8:
+        raise movie.MovieError(f"stream de hashes com {len(data)} bytes (esperados {HASH_HEADER.size + frames * 8})")
+    hasher = StateHasher()
+    hasher.rom_checksum = checksum
+    hasher.start_frame = start_frame
+    hasher.digests.frombytes(data[HASH_HEADER.size:])
+    if sys.byteorder == "big":
+        hasher.digests.byteswap()
+    return hasher
+
+
+def record_hashes(gb, recording, **options):
+    # Reproduz o movie gerando o stream (movies gravados sem hashes, ou nova referência)
+    hasher = StateHasher()
+    source = movie.start_playback(gb, recording)
+    hasher.reset(gb)
+    options.setdefault("audio", movie.playback_audio(recording))
+    gb.run(input_source=source, max_frames=recording.end_frame, on_frame=hasher.update, **options)
+    return hasher
+
+
+def verify(gb, recording, expected, **options):
+    # Reproduz o movie comparando o hash de cada frame com o stream de referência.
+    # Devolve None se todos batem, senão (frame, núcleo diferente, memória diferente)
+    # do primeiro frame divergente (a reprodução para nele).
+    if expected.rom_checksum != recording.rom_checksum or expected.start_frame != recording.start_frame:
+        raise movie.MovieError("o stream de hashes não é deste movie")
+    hasher = StateHasher()
+    source = movie.start_playback(gb, recording)
+    hasher.reset(gb)
+    digests = expected.digests
+    frames = expected.frames()
+    divergence = None
+
+    def on_frame(gb):
+        nonlocal divergence
+        index = gb.frame_count - expected.start_frame - 1
+        if index >= frames:
+            return True
+        core, memory = hasher.digest(gb)
+        if core != digests[2 * index] or memory != digests[2 * index + 1]:
+            divergence = (gb.frame_count, core != digests[2 * index], memory != digests[2 * index + 1])
+            return True
+        return False
+
+    options.setdefault("audio", movie.playback_audio(recording))
+    gb.run(input_source=source, max_frames=recording.end_frame, on_frame=on_frame, **options)
+    return divergence
@@ -0,0 +1,49 @@
+import contextlib
+import os
+import sys
+
+import pytest
+
+# Os módulos ficam na raiz do repositório; os testes rodam sem janela
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from CPU import GameBoy  # noqa: E402
+
+ENTRY = bytes([0x00, 0xC3, 0x50, 0x01]) # 0x100: NOP; JP 0x150
+
+
+def build_rom(code, size=0x8000, patches=()):
+    # ROM sintética: entrada padrão pulando para `code` em 0x150; patches = [(endereço, bytes)]
+    rom = bytearray(size)
+    for addr, data in patches:
+        rom[addr : addr + len(data)] = data
+    rom[0x100:0x104] = ENTRY
+    rom[0x150 : 0x150 + len(code)] = code
+    return rom
+
+
+@pytest.fixture
+def load_rom(tmp_path):
+    # load_rom(code, size=, patches=) -> GameBoy com a ROM sintética carregada (power-on)
+    def load(code, size=0x8000, patches=()):
+        path = tmp_path / "synthetic.gb"
+        path.write_bytes(build_rom(code, size, patches))
+        gb = GameBoy()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            gb.load_rom(str(path))
+        return gb
+
+    return load
+
+
+@pytest.fixture
+def run_rom(load_rom):
+    # run_rom(code, frames, size=, patches=, **opções do run) -> GameBoy depois de `frames` frames headless
+    def run(code, frames, size=0x8000, patches=(), **options):
+        gb = load_rom(code, size, patches)
+        gb.run(headless=True, speed=None, max_frames=frames, **options)
+        return gb
+
+    return run
@@ -0,0 +1,37 @@
+import time
+
+import numpy as np
+
+from apu import DeviceSink
+from pacing import AudioPacer
+
+# speed="audio" com o dispositivo parado (driver "dummy" do SDL, pausado): a espera pelo
+# buffer tem prazo e o pacer passa a andar por tempo em vez de travar a emulação.
+
+
+def test_stalled_device_falls_back_to_frame_pacing():
+    sink = DeviceSink()
+    try:
+        sink.device.pause(1)
+        sink.write(np.zeros((sink.target_fill * 2, 2), dtype=np.int16))
+        pacer = AudioPacer(sink)
+
+        start = time.perf_counter()
+        pacer.wait()
+        assert pacer.stalled
+        assert time.perf_counter() - start < sink.wait_timeout + 0.5
+
+        start = time.perf_counter()
+        for _ in range(5):
+            pacer.wait()
+        assert pacer.stalled
+        assert time.perf_counter() - start < 2 * sink.wait_timeout # Ritmo por frame, sem o prazo
+
+        # O dispositivo volta a consumir: o áudio retoma o ritmo
+        sink.device.pause(0)
+        deadline = time.perf_counter() + 5
+        while pacer.stalled and time.perf_counter() < deadline:
+            pacer.wait()
+        assert not pacer.stalled
+    finally:
+        sink.close()
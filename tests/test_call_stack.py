@@ -0,0 +1,26 @@
+from profiler import CallStackTracker
+
+# Pilha sombra do profiler de chamadas (gbpy calls) com ROMs sintéticas:
+#   0x100: NOP; JP 0x150
+#   0x150: DI; LD SP,0xDFFE; corpo
+
+SETUP = bytes([0xF3, 0x31, 0xFE, 0xDF]) # DI; LD SP,0xDFFE
+
+
+def test_runaway_rst_is_bounded(run_rom):
+    # RST 38 sobre 0xFF (RST 38 de novo): a pilha do jogo desce sem nunca retornar
+    tracker = CallStackTracker(max_depth=64)
+    run_rom(SETUP + bytes([0xFF]), 60, patches=[(0x38, bytes([0xFF]))], call_tracker=tracker)
+    assert len(tracker.stack) == len(tracker.callers) == 64
+    assert len(tracker.keys) == 65 # Raiz + um caminho por nível
+
+
+def test_deep_recursion_unwinds_to_root(run_rom):
+    # 0x200: DEC A; JR Z,+3; CALL 0x200; RET - recursão de 200 níveis, depois laço infinito
+    body = bytes([0x3E, 200, 0xCD, 0x00, 0x02, 0x18, 0xFE]) # LD A,200; CALL 0x200; JR -2
+    recursion = (0x200, bytes([0x3D, 0x28, 0x03, 0xCD, 0x00, 0x02, 0xC9]))
+    tracker = CallStackTracker(max_depth=16)
+    run_rom(SETUP + body, 2, patches=[recursion], call_tracker=tracker)
+    assert tracker.stack == [] and tracker.callers == []
+    assert tracker.node == 0
+    assert len(tracker.keys) == 17
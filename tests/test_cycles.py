@@ -0,0 +1,76 @@
+import pytest
+
+# Ciclos por instrução (t-states, Pan Docs) medidos com uma ROM sintética:
+#   0x100: NOP; JP 0x150
+#   0x150: DI; LD HL,0xC000; LD SP,0xDFFE; loop: corpo x REPEAT; JP loop
+# Com as interrupções desligadas, a sequência executada é conhecida: roda 1 frame e compara
+# gb.cycle_count com a soma exata dos ciclos das gb.instruction_count instruções executadas.
+
+REPEAT = 32
+PREFIX = [4, 16, 4, 12, 12]
+LOOP = 0x150 + 7
+JP_CYCLES = 16
+
+# nome: (bytes do corpo, ciclos de cada instrução executada no corpo)
+CASES = {
+    "NOP": ("00", [4]),
+    "STOP": ("10 00", [4]),
+    "LD BC,nn": ("01 34 12", [12]),
+    "LD (nn),SP": ("08 00 C0", [20]),
+    "LD B,C": ("41", [4]),
+    "LD B,(HL)": ("46", [8]),
+    "LD (HL),B": ("70", [8]),
+    "LD (HL),n": ("36 55", [12]),
+    "LD B,n": ("06 55", [8]),
+    "LD A,(BC)": ("0A", [8]),
+    "LD A,(HL+)": ("2A", [8]),
+    "LD A,(nn)": ("FA 00 C0", [16]),
+    "LD (nn),A": ("EA 00 C0", [16]),
+    "LDH A,(n)": ("F0 80", [12]),
+    "LDH (n),A": ("E0 80", [12]),
+    "LD SP,HL": ("F9", [8]),
+    "LD HL,SP+e": ("F8 00", [12]),
+    "ADD SP,e": ("E8 00", [16]),
+    "INC B": ("04", [4]),
+    "INC (HL)": ("34", [12]),
+    "INC BC": ("03", [8]),
+    "ADD HL,BC": ("09", [8]),
+    "ADD A,B": ("80", [4]),
+    "ADD A,(HL)": ("86", [8]),
+    "ADD A,n": ("C6 01", [8]),
+    "XOR A": ("AF", [4]),
+    "DAA": ("27", [4]),
+    "RLCA": ("07", [4]),
+    "DI": ("F3", [4]),
+    "JR e": ("18 00", [12]),
+    "JR Z,e (pula)": ("AF 28 00", [4, 12]),
+    "JR NZ,e (não pula)": ("AF 20 00", [4, 8]),
+    "PUSH BC / POP BC": ("C5 C1", [16, 12]),
+    "CALL nn / RET": ("CD 00 70", [24, 16]), # RET em 0x7000
+    "RST 38 / RET": ("FF", [16, 16]),        # RET em 0x0038
+    "RLC B": ("CB 00", [8]),
+    "RLC (HL)": ("CB 06", [16]),
+    "SWAP A": ("CB 37", [8]),
+    "BIT 0,B": ("CB 40", [8]),
+    "BIT 0,(HL)": ("CB 46", [12]),
+    "SET 0,(HL)": ("CB C6", [16]),
+}
+
+
+def program(body):
+    return (bytes([0xF3, 0x21, 0x00, 0xC0, 0x31, 0xFE, 0xDF]) + body * REPEAT
+            + bytes([0xC3, LOOP & 0xFF, LOOP >> 8]))
+
+
+def expected_cycles(instructions, body_cycles):
+    period = body_cycles * REPEAT + [JP_CYCLES]
+    total = sum(PREFIX[:instructions])
+    full, rest = divmod(instructions - len(PREFIX), len(period))
+    return total + full * sum(period) + sum(period[:rest])
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_cycles_per_instruction(name, run_rom):
+    body, body_cycles = CASES[name]
+    gb = run_rom(program(bytes.fromhex(body)), 1, patches=[(0x38, b"\xC9"), (0x7000, b"\xC9")])
+    assert gb.cycle_count == expected_cycles(gb.instruction_count, body_cycles)
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from filters import PixelFilter
+
+# Compara os filtros vetorizados com as regras do Scale2x/Scale3x aplicadas pixel a pixel
+# (bordas replicadas), numa tela de ruído em que todas as regras aparecem.
+
+WIDTH, HEIGHT = 160, 144
+
+
+def noise_frame(seed):
+    rng = random.Random(seed)
+    return bytearray(rng.randrange(4) for _ in range(WIDTH * HEIGHT))
+
+
+def neighbors(src, x, y):
+    h, w = src.shape
+    return [src[min(max(y + dy, 0), h - 1), min(max(x + dx, 0), w - 1)]
+            for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+
+def scale2x_reference(src):
+    h, w = src.shape
+    out = np.zeros((h * 2, w * 2), dtype=np.uint8)
+    for y in range(h):
+        for x in range(w):
+            _, b, _, d, e, f, _, hh, _ = neighbors(src, x, y)
+            e0 = e1 = e2 = e3 = e
+            if b != hh and d != f:
+                e0 = d if d == b else e
+                e1 = f if b == f else e
+                e2 = d if d == hh else e
+                e3 = f if hh == f else e
+            out[2 * y : 2 * y + 2, 2 * x : 2 * x + 2] = [[e0, e1], [e2, e3]]
+    return out
+
+
+def scale3x_reference(src):
+    h, w = src.shape
+    out = np.zeros((h * 3, w * 3), dtype=np.uint8)
+    for y in range(h):
+        for x in range(w):
+            a, b, c, d, e, f, g, hh, i = neighbors(src, x, y)
+            block = [e] * 9
+            if b != hh and d != f:
+                block = [
+                    d if d == b else e,
+                    b if (d == b and e != c) or (b == f and e != a) else e,
+                    f if b == f else e,
+                    d if (d == b and e != g) or (d == hh and e != a) else e,
+                    e,
+                    f if (b == f and e != i) or (hh == f and e != c) else e,
+                    d if d == hh else e,
+                    hh if (d == hh and e != i) or (hh == f and e != g) else e,
+                    f if hh == f else e,
+                ]
+            out[3 * y : 3 * y + 3, 3 * x : 3 * x + 3] = np.array(block).reshape(3, 3)
+    return out
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_scale_filters_match_reference(seed):
+    framebuffer = noise_frame(seed)
+    src = np.frombuffer(framebuffer, dtype=np.uint8).reshape(HEIGHT, WIDTH)
+    doubled = scale2x_reference(src)
+
+    for name, expected in (("nearest", np.repeat(np.repeat(src, 3, axis=0), 3, axis=1)),
+                           ("scale2x", doubled),
+                           ("scale3x", scale3x_reference(src)),
+                           ("scale4x", scale2x_reference(doubled))):
+        pixel_filter = PixelFilter(name, framebuffer, scale=3)
+        pixel_filter.apply()
+        assert (pixel_filter.output == expected).all(), name
@@ -0,0 +1,49 @@
+import movie
+import statehash
+from apu import WaveSink
+from inputs import ScriptInput
+
+# Movie gravado com áudio (o APU escreve em 0xFF10-0xFF26) tem que reproduzir bit a bit:
+# a reprodução e o verificador rodam o APU de novo (sem saída).
+
+# LD A,80; LDH (26),A; LD A,F0; LDH (12),A; LD A,00; LDH (11),A; LD A,C7; LDH (14),A; JR -2
+# (liga o som e dispara o canal 1 com duração de 64/256 s: ele desliga sozinho no meio do movie)
+PROGRAM = bytes([0x3E, 0x80, 0xE0, 0x26, 0x3E, 0xF0, 0xE0, 0x12, 0x3E, 0x00, 0xE0, 0x11,
+                 0x3E, 0xC7, 0xE0, 0x14, 0x18, 0xFE])
+FRAMES = 30
+
+
+def test_movie_recorded_with_audio_replays(load_rom, tmp_path):
+    gb = load_rom(PROGRAM)
+    recording, source = movie.begin_recording(gb, ScriptInput([(10, 0x01), (20, 0x00)]), apu=True)
+    hasher = statehash.StateHasher()
+    hasher.reset(gb)
+    gb.run(headless=True, speed=None, max_frames=FRAMES, audio=WaveSink(str(tmp_path / "out.wav")),
+           input_source=source, on_frame=hasher.update)
+    movie.finish_recording(gb, recording)
+    movie.save_movie(recording, tmp_path / "m.gbm")
+    statehash.save_hashes(hasher, tmp_path / "m.gbh")
+
+    loaded = movie.load_movie(tmp_path / "m.gbm")
+    assert loaded.apu and loaded.events == recording.events
+
+    replay = load_rom(PROGRAM)
+    movie.play(replay, loaded, headless=True, speed=None)
+    assert replay.frame_count == FRAMES
+    assert bytes(replay.Memory) == bytes(gb.Memory)
+
+    assert statehash.verify(load_rom(PROGRAM), loaded, statehash.load_hashes(tmp_path / "m.gbh")) is None
+
+
+def test_movie_without_audio_replays_without_apu(load_rom, tmp_path):
+    gb = load_rom(PROGRAM)
+    recording, source = movie.begin_recording(gb, ScriptInput([]))
+    gb.run(headless=True, speed=None, max_frames=FRAMES, input_source=source)
+    movie.finish_recording(gb, recording)
+    movie.save_movie(recording, tmp_path / "m.gbm")
+
+    loaded = movie.load_movie(tmp_path / "m.gbm")
+    assert not loaded.apu
+    replay = load_rom(PROGRAM)
+    movie.play(replay, loaded, headless=True, speed=None)
+    assert bytes(replay.Memory) == bytes(gb.Memory)
@@ -0,0 +1,52 @@
+from rewind import RewindBuffer
+
+# ROM sintética de 4 bancos: cada banco é preenchido com o próprio número e o programa troca
+# de banco (1 -> 2 -> 3) com uma espera de ~1 frame entre as trocas, escrevendo o banco em 0xC000.
+# Voltar no tempo tem que restaurar a memória inteira daquele frame, inclusive o banco mapeado.
+
+DELAY = 0x0200 # Sub-rotina de espera: LD BC,2500; DEC BC; LD A,B; OR C; JR NZ; RET (~70000 ciclos)
+
+
+def program():
+    code = bytearray([0xF3, 0x31, 0xFE, 0xDF]) # DI; LD SP,0xDFFE
+    loop = 0x150 + len(code)
+    for bank in range(1, 4):
+        # LD A,bank; LD (0x2000),A; LD (0xC000),A; CALL DELAY
+        code += bytes([0x3E, bank, 0xEA, 0x00, 0x20, 0xEA, 0x00, 0xC0, 0xCD, DELAY & 0xFF, DELAY >> 8])
+    code += bytes([0xC3, loop & 0xFF, loop >> 8])
+    return code
+
+
+PATCHES = [(bank * 0x4000, bytes([bank]) * 0x4000) for bank in range(1, 4)] + [
+    (DELAY, bytes([0x01, 0xC4, 0x09, 0x0B, 0x78, 0xB1, 0x20, 0xFB, 0xC9]))]
+
+
+def test_rewind_across_bank_switches(run_rom):
+    memory = {}
+    banks = {}
+
+    def on_frame(gb):
+        memory[gb.frame_count] = bytes(gb.Memory)
+        banks[gb.frame_count] = gb.rom_bank
+
+    rewind = RewindBuffer(interval=1, max_mb=16)
+    gb = run_rom(program(), 24, size=0x10000, patches=PATCHES, on_frame=on_frame, rewind=rewind)
+    assert len(set(banks.values())) == 3
+
+    # O primeiro passo volta para a última captura (banco diferente do da primeira captura)
+    last = gb.frame_count
+    assert banks[last] != banks[1]
+    assert rewind.step_back(gb)
+    assert gb.frame_count == last
+    assert bytes(gb.Memory) == memory[last]
+
+    while rewind.deltas:
+        assert rewind.step_back(gb)
+        assert gb.rom_bank == banks[gb.frame_count]
+        assert bytes(gb.Memory) == memory[gb.frame_count]
+
+    # No estado mais velho: não volta mais, mas continua nele
+    oldest = gb.frame_count
+    assert not rewind.step_back(gb)
+    assert gb.frame_count == oldest
+    assert bytes(gb.Memory) == memory[oldest]